@@ -0,0 +1,267 @@
+"""认证接口并发负载测试。
+
+默认在进程内对比三种数据库访问方式（使用临时数据库，不触碰 crypto_lab.db）：
+
+- legacy：按改动前的方式每次调用新建连接，并直接在事件循环中同步执行；
+- pooled：``database.db`` 异步门面（WAL 连接池 + 专用线程池），关闭令牌缓存；
+- cached：同上并开启令牌缓存（令牌校验的热路径不再访问数据库）。
+
+每种方式由 --concurrency 个协程共发出 --requests 次令牌校验（profile）与
+--login-requests 次登录，统计吞吐、延迟分位数以及事件循环的最大停顿
+（每 5ms 唤醒一次的心跳任务的最大延迟）。
+
+--storm N 另测登录风暴：N 个登录同时到达，期间持续做（不走缓存的）令牌校验。
+密码哈希在独立的有界队列中执行，超出队列上限的登录被拒绝（计入 fail），令牌
+校验不会排在哈希后面。
+
+指定 --url 时改为对运行中的服务（aiohttp，默认端口 8081）发起真实 HTTP 请求。
+
+用法（在 backend 目录下）::
+
+    python benchmarks/bench_auth.py --requests 5000 --concurrency 50
+    python benchmarks/bench_auth.py --url http://127.0.0.1:8081 --requests 2000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+from percentiles import percentile  # noqa: E402
+from work_queue import ServerBusyError  # noqa: E402
+
+PASSWORD = "bench-password"
+
+
+def legacy_verify_token(token: str) -> Optional[Dict[str, Any]]:
+    conn = sqlite3.connect(database.DB_NAME)
+    c = conn.cursor()
+    c.execute(
+        """SELECT u.id, u.username, u.email, u.is_active
+           FROM users u WHERE u.token = ? AND u.is_active = 1""",
+        (token,),
+    )
+    user = c.fetchone()
+    conn.close()
+    return {"id": user[0], "username": user[1], "email": user[2]} if user else None
+
+
+def legacy_login_user(username: str, password: str) -> Dict[str, Any]:
+    conn = sqlite3.connect(database.DB_NAME)
+    c = conn.cursor()
+    c.execute(
+        "SELECT id, password_hash, password_salt FROM users WHERE username = ?", (username,)
+    )
+    user_id, password_hash, password_salt = c.fetchone()
+    if not database.verify_password(password, password_hash, password_salt):
+        conn.close()
+        return {"success": False}
+    token = database.generate_token()
+    c.execute("UPDATE users SET token = ? WHERE id = ?", (token, user_id))
+    c.execute(
+        "INSERT INTO user_sessions (user_id, token, ip_address) VALUES (?, ?, ?)",
+        (user_id, token, "127.0.0.1"),
+    )
+    conn.commit()
+    conn.close()
+    return {"success": True, "token": token}
+
+
+async def _loop_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        worst = max(worst, loop.time() - expected)
+    return worst
+
+
+async def drive(
+    label: str,
+    call: Callable[[int], Awaitable[bool]],
+    requests: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    """以 concurrency 个协程共发出 requests 次 call(i)，返回吞吐与延迟统计。"""
+    latencies: List[float] = []
+    failures = 0
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal failures
+        for i in counter:
+            started = time.perf_counter()
+            ok = await call(i)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if not ok:
+                failures += 1
+
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_loop_lag(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    lag = await probe
+    return {
+        "case": label,
+        "requests": requests,
+        "failures": failures,
+        "req_per_sec": requests / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies),
+        "loop_lag_max_ms": lag * 1000,
+    }
+
+
+def _prepare_users(count: int) -> Tuple[List[str], List[str]]:
+    usernames = [f"bench_user_{i}" for i in range(count)]
+    tokens = []
+    for username in usernames:
+        database.register_user(username, PASSWORD)
+        tokens.append(database.login_user(username, PASSWORD)["token"])
+    return usernames, tokens
+
+
+async def run_inprocess(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    usernames, tokens = _prepare_users(args.users)
+    results: List[Dict[str, Any]] = []
+
+    async def legacy_profile(i: int) -> bool:
+        return legacy_verify_token(tokens[i % len(tokens)]) is not None
+
+    async def pooled_profile(i: int) -> bool:
+        return await database.db.verify_token(tokens[i % len(tokens)]) is not None
+
+    results.append(await drive("legacy profile", legacy_profile, args.requests, args.concurrency))
+    cache_size = database.token_cache.max_size
+    database.token_cache.max_size = 0
+    results.append(await drive("pooled profile", pooled_profile, args.requests, args.concurrency))
+    database.token_cache.max_size = cache_size
+    results.append(await drive("cached profile", pooled_profile, args.requests, args.concurrency))
+
+    if args.storm:
+        database.register_user("bench_storm", PASSWORD)
+
+        async def storm_login(i: int) -> bool:
+            try:
+                result = await database.db.login_user("bench_storm", PASSWORD)
+            except ServerBusyError:
+                return False
+            return result["success"]
+
+        database.token_cache.max_size = 0
+        database.token_cache.clear()
+        storm = asyncio.create_task(drive("storm login", storm_login, args.storm, args.storm))
+        await asyncio.sleep(0)
+        during = await drive(
+            "profile in storm", pooled_profile, max(1, args.requests // 5), args.concurrency
+        )
+        results.extend([await storm, during])
+        database.token_cache.max_size = cache_size
+
+    if args.login_requests:
+
+        async def legacy_login(i: int) -> bool:
+            return legacy_login_user(usernames[i % len(usernames)], PASSWORD)["success"]
+
+        async def pooled_login(i: int) -> bool:
+            result = await database.db.login_user(usernames[i % len(usernames)], PASSWORD)
+            return result["success"]
+
+        results.append(
+            await drive("legacy login", legacy_login, args.login_requests, args.concurrency)
+        )
+        results.append(
+            await drive("pooled login", pooled_login, args.login_requests, args.concurrency)
+        )
+    return results
+
+
+async def run_http(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    from aiohttp import ClientSession, TCPConnector
+
+    base = args.url.rstrip("/")
+    usernames = [f"bench_user_{i}" for i in range(args.users)]
+    async with ClientSession(connector=TCPConnector(limit=args.concurrency)) as session:
+        tokens = []
+        for username in usernames:
+            # 已注册时返回 409，不影响后续登录
+            await session.post(
+                f"{base}/api/auth/register", json={"username": username, "password": PASSWORD}
+            )
+            async with session.post(
+                f"{base}/api/auth/login", json={"username": username, "password": PASSWORD}
+            ) as resp:
+                tokens.append((await resp.json())["token"])
+
+        async def profile(i: int) -> bool:
+            headers = {"Authorization": f"Bearer {tokens[i % len(tokens)]}"}
+            async with session.get(f"{base}/api/auth/profile", headers=headers) as resp:
+                await resp.read()
+                return resp.status == 200
+
+        async def login(i: int) -> bool:
+            payload = {"username": usernames[i % len(usernames)], "password": PASSWORD}
+            async with session.post(f"{base}/api/auth/login", json=payload) as resp:
+                body = await resp.json()
+                if resp.status == 200:
+                    tokens[i % len(tokens)] = body["token"]
+                return resp.status == 200
+
+        results = [await drive("http profile", profile, args.requests, args.concurrency)]
+        if args.login_requests:
+            results.append(await drive("http login", login, args.login_requests, args.concurrency))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None, help="运行中服务的 HTTP 地址，省略则进程内对比")
+    parser.add_argument("--users", type=int, default=20, help="预先注册的用户数")
+    parser.add_argument("--requests", type=int, default=5000, help="令牌校验请求总数")
+    parser.add_argument("--login-requests", type=int, default=100, help="登录请求总数，0 表示跳过")
+    parser.add_argument("--storm", type=int, default=0, help="登录风暴中同时到达的登录数")
+    parser.add_argument("--concurrency", type=int, default=50, help="并发协程数")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args()
+
+    if args.url:
+        results = asyncio.run(run_http(args))
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            database.DB_NAME = os.path.join(tmp, "bench_auth.db")
+            database.init_db()
+            try:
+                results = asyncio.run(run_inprocess(args))
+            finally:
+                database.db.close()
+
+    if args.json:
+        print(json.dumps({"results": results}, indent=2))
+        return
+    print(
+        f"{'case':<16}{'reqs':>7}{'fail':>6}{'req/s':>9}{'p50':>8}{'p95':>8}"
+        f"{'p99':>8}{'max':>8}{'loop lag':>10}  (ms)"
+    )
+    for r in results:
+        print(
+            f"{r['case']:<16}{r['requests']:>7}{r['failures']:>6}{r['req_per_sec']:>9.0f}"
+            f"{r['p50_ms']:>8.1f}{r['p95_ms']:>8.1f}{r['p99_ms']:>8.1f}{r['max_ms']:>8.1f}"
+            f"{r['loop_lag_max_ms']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
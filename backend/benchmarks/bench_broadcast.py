@@ -0,0 +1,154 @@
+"""广播延迟基准：对比逐连接 gather 发送与 Broadcaster。
+
+使用内存中的模拟连接，可离线运行。一部分连接模拟卡住的慢速客户端
+（send 挂起、发送缓冲区积压），连续广播多轮，统计正常客户端收到消息
+的延迟分位数、publish 调用本身的耗时以及慢速连接的丢弃/断开情况。
+
+用法（在 backend 目录下）::
+
+    python benchmarks/bench_broadcast.py --clients 10000 --slow 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, Iterable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from broadcaster import Broadcaster  # noqa: E402
+from percentiles import percentile  # noqa: E402
+
+
+class FakeTransport:
+    def __init__(self, buffered: int) -> None:
+        self.buffered = buffered
+
+    def get_write_buffer_size(self) -> int:
+        return self.buffered
+
+
+class FakeConnection:
+    """模拟 WebSocket 连接：慢速连接的 send 会卡住 stall 秒，且发送缓冲区始终积压。"""
+
+    def __init__(self, stall: float, latencies: List[float]) -> None:
+        self.stall = stall
+        self.latencies = latencies
+        self.sent_at = 0.0
+        self.remote_address = None
+        self.transport = FakeTransport(1 << 30 if stall else 0)
+
+    def deliver(self) -> None:
+        self.latencies.append(time.perf_counter() - self.sent_at)
+
+    async def send(self, payload: Any) -> None:
+        if self.stall:
+            await asyncio.sleep(self.stall)
+        else:
+            self.deliver()
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        return None
+
+
+def fake_write(connections: Iterable[FakeConnection], payload: Any) -> None:
+    """与 websockets.broadcast 相同的同步写入语义。"""
+    for conn in connections:
+        conn.deliver()
+
+
+def _summary(name: str, publish: List[float], latencies: List[float], **extra: Any) -> Dict[str, Any]:
+    return {
+        "mode": name,
+        "publish_ms": max(publish) * 1000,
+        "delivered_fast": len(latencies),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+        **extra,
+    }
+
+
+def _build(clients: int, slow: float, stall: float, latencies: List[float]) -> List[FakeConnection]:
+    rng = random.Random(42)
+    return [FakeConnection(stall if rng.random() < slow else 0.0, latencies) for _ in range(clients)]
+
+
+async def bench_gather(args: argparse.Namespace, payload: str) -> Dict[str, Any]:
+    """旧实现：每轮对所有连接 gather(send)，卡住的连接拖住整轮广播。"""
+    latencies: List[float] = []
+    conns = _build(args.clients, args.slow, args.stall, latencies)
+    publish: List[float] = []
+    for _ in range(args.rounds):
+        start = time.perf_counter()
+        for conn in conns:
+            conn.sent_at = start
+        await asyncio.gather(*(conn.send(payload) for conn in conns), return_exceptions=True)
+        publish.append(time.perf_counter() - start)
+    return _summary("gather", publish, latencies)
+
+
+async def bench_broadcaster(args: argparse.Namespace, payload: str) -> Dict[str, Any]:
+    latencies: List[float] = []
+    conns = _build(args.clients, args.slow, args.stall, latencies)
+    broadcaster = Broadcaster(queue_size=args.queue_size, send_timeout=args.stall / 2, write=fake_write)
+    for conn in conns:
+        broadcaster.register(conn)
+
+    publish: List[float] = []
+    for _ in range(args.rounds):
+        start = time.perf_counter()
+        for conn in conns:
+            conn.sent_at = start
+        broadcaster.publish(payload)
+        publish.append(time.perf_counter() - start)
+        # 让出事件循环，模拟两次广播之间的正常调度
+        await asyncio.sleep(0)
+    metrics = broadcaster.metrics()
+    for conn in conns:
+        broadcaster.unregister(conn)
+    return _summary(
+        "broadcaster",
+        publish,
+        latencies,
+        dropped=metrics["dropped"],
+        disconnected=metrics["disconnected"],
+        backlogged=metrics["backlogged"],
+    )
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    payload = json.dumps({"type": "KEY_ROTATED", "keys": {"PAILLIER": {"n": "9" * 617}}})
+    return [await bench_gather(args, payload), await bench_broadcaster(args, payload)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=10000, help="模拟连接数")
+    parser.add_argument("--slow", type=float, default=0.01, help="慢速连接比例")
+    parser.add_argument("--stall", type=float, default=2.0, help="慢速连接每次发送卡住的秒数")
+    parser.add_argument("--rounds", type=int, default=3, help="连续广播轮数")
+    parser.add_argument("--queue-size", type=int, default=8, help="Broadcaster 每连接队列长度")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'mode':<13}{'publish':>10}{'fast p50':>10}{'fast p99':>10}{'fast max':>10}  (ms, 最慢一轮)")
+    for r in results:
+        print(
+            f"{r['mode']:<13}{r['publish_ms']:>10.1f}{r['p50_ms']:>10.1f}"
+            f"{r['p99_ms']:>10.1f}{r['max_ms']:>10.1f}"
+        )
+    extra = results[-1]
+    print(f"慢速连接：积压 {extra['backlogged']}，丢弃 {extra['dropped']} 条，断开 {extra['disconnected']}")
+
+
+if __name__ == "__main__":
+    main()
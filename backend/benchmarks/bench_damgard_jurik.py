@@ -0,0 +1,95 @@
+"""Damgård–Jurik 与 Paillier 的吞吐与密文扩张对比。
+
+两者都按明文打包方式加密同一组数值（默认 32 位、最多 1024 次相加），
+分别统计加密、同态求和与解密耗时，以及每个明文平均占用的密文字节数。
+Paillier 的混淆因子池关闭，两者都测逐个计算的稳态开销。
+
+用法（在 backend 目录下）::
+
+    python benchmarks/bench_damgard_jurik.py --count 2000 --s 1 2 3
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bigint  # noqa: E402
+from fhe_service import BaseEngine, DamgardJurikEngine, PaillierEngine  # noqa: E402
+
+
+def bench_engine(label: str, engine: BaseEngine, values: List[int], value_bits: int) -> Dict[str, Any]:
+    layout = engine.packing_layout(value_bits)
+
+    start = time.perf_counter()
+    items = engine.encrypt_packed(values, layout)
+    encrypt_s = time.perf_counter() - start
+
+    ciphertexts = [ciphertext for _, ciphertext in items]
+    start = time.perf_counter()
+    acc = engine.aggregate_raw(ciphertexts)
+    aggregate_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, slots = engine.finalize_packed(acc, layout)
+    decrypt_s = time.perf_counter() - start
+    if sum(slots) != sum(values):
+        raise RuntimeError(f"{label} 解密结果不一致")
+
+    payload = len(engine.pack_ciphertexts(ciphertexts))
+    return {
+        "case": label,
+        "count": len(values),
+        "slots": layout.slots,
+        "ciphertexts": len(ciphertexts),
+        "ciphertext_bytes": engine.ciphertext_width,
+        "bytes_per_value": payload / len(values),
+        "encrypt_ops_per_sec": len(values) / encrypt_s,
+        "aggregate_ms": aggregate_s * 1000,
+        "decrypt_ms": decrypt_s * 1000,
+    }
+
+
+def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    values = [random.randrange(1 << args.value_bits) for _ in range(args.count)]
+    paillier = PaillierEngine(args.bits)
+    paillier.close()
+    results = [bench_engine("PAILLIER", paillier, values, args.value_bits)]
+    for s in args.s:
+        engine = DamgardJurikEngine(args.bits, s=s)
+        results.append(bench_engine(f"DAMGARD_JURIK s={s}", engine, values, args.value_bits))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=2000, help="加密的数值个数")
+    parser.add_argument("--bits", type=int, default=2048, help="模数 n 的位数")
+    parser.add_argument("--s", type=int, nargs="+", default=[1, 2, 3], help="Damgård–Jurik 参数 s")
+    parser.add_argument("--value-bits", type=int, default=32, help="每个数值的位数")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps({"backend": bigint.BACKEND, "results": results}, indent=2))
+        return
+    print(f"大整数后端: {bigint.BACKEND}")
+    print(
+        f"{'case':<20}{'slots':>7}{'ct bytes':>10}{'B/value':>9}"
+        f"{'enc/s':>9}{'agg ms':>9}{'dec ms':>9}"
+    )
+    for r in results:
+        print(
+            f"{r['case']:<20}{r['slots']:>7}{r['ciphertext_bytes']:>10}{r['bytes_per_value']:>9.1f}"
+            f"{r['encrypt_ops_per_sec']:>9.0f}{r['aggregate_ms']:>9.1f}{r['decrypt_ms']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
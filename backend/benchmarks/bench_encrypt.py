@@ -0,0 +1,111 @@
+"""批量加密吞吐基准。
+
+对各引擎的 encrypt_raw 计时；ElGamal 额外按不同的固定底数表内存预算
+分别测量，预算 0 即逐个模幂的原始实现。Paillier 另测明文打包，每个密文
+容纳多个 --value-bits 位的数值，ops/s 按明文个数计算。
+
+用法（在 backend 目录下）::
+
+    python benchmarks/bench_encrypt.py --count 2000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bigint  # noqa: E402
+from fhe_service import BaseEngine, ElGamalEngine, PaillierEngine, RSAEngine  # noqa: E402
+
+
+def bench_engine(label: str, engine: BaseEngine, count: int) -> Dict[str, Any]:
+    values = list(range(1, count + 1))
+    start = time.perf_counter()
+    engine.encrypt_raw(values)
+    elapsed = time.perf_counter() - start
+    return {
+        "case": label,
+        "count": count,
+        "total_ms": elapsed * 1000,
+        "per_item_us": elapsed / count * 1e6,
+        "ops_per_sec": count / elapsed,
+        **engine.stats(),
+    }
+
+
+def bench_packed(label: str, engine: PaillierEngine, count: int, value_bits: int) -> Dict[str, Any]:
+    layout = engine.packing_layout(value_bits)
+    values = [i % (1 << value_bits) for i in range(1, count + 1)]
+    start = time.perf_counter()
+    items = engine.encrypt_packed(values, layout)
+    elapsed = time.perf_counter() - start
+    return {
+        "case": label,
+        "count": count,
+        "total_ms": elapsed * 1000,
+        "per_item_us": elapsed / count * 1e6,
+        "ops_per_sec": count / elapsed,
+        "slots": layout.slots,
+        "ciphertexts": len(items),
+    }
+
+
+def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+    elgamal = ElGamalEngine(args.elgamal_bits, table_budget=0)
+    blob = elgamal.export_private()
+    for budget_kb in args.budgets:
+        engine = ElGamalEngine.from_private(blob)
+        engine.table_budget = budget_kb * 1024
+        engine.start()
+        results.append(bench_engine(f"ELGAMAL {budget_kb}KB", engine, args.count))
+
+    if not args.elgamal_only:
+        rsa = RSAEngine(1024)
+        results.append(bench_engine("RSA", rsa, args.count))
+        paillier = PaillierEngine(2048)
+        # 混淆因子池只影响突发请求，这里测稳态的逐个计算
+        paillier.close()
+        results.append(bench_engine("PAILLIER", paillier, max(1, args.count // 100)))
+        results.append(bench_packed("PAILLIER packed", paillier, args.count, args.value_bits))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=2000, help="每个用例加密的数值个数")
+    parser.add_argument("--elgamal-bits", type=int, default=384, help="ElGamal 安全素数位数")
+    parser.add_argument(
+        "--budgets",
+        type=int,
+        nargs="+",
+        default=[0, 1024, 4096, 16384],
+        help="ElGamal 固定底数表内存预算（KB）",
+    )
+    parser.add_argument("--value-bits", type=int, default=32, help="Paillier 打包时每个数值的位数")
+    parser.add_argument("--elgamal-only", action="store_true", help="只测 ElGamal")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps({"backend": bigint.BACKEND, "results": results}, indent=2))
+        return
+    print(f"大整数后端: {bigint.BACKEND}")
+    print(
+        f"{'case':<18}{'count':>7}{'total ms':>11}{'us/item':>10}{'ops/s':>10}"
+        f"{'window':>8}{'slots':>7}"
+    )
+    for r in results:
+        print(
+            f"{r['case']:<18}{r['count']:>7}{r['total_ms']:>11.1f}{r['per_item_us']:>10.1f}"
+            f"{r['ops_per_sec']:>10.0f}{r.get('fixed_base_window', '-'):>8}{r.get('slots', '-'):>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
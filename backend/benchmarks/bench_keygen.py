@@ -0,0 +1,98 @@
+"""密钥生成延迟基准：对比旧的随机候选 + 9 个小素数试除与增量筛。
+
+每种算法重复生成若干次，报告均值与 p50/p90/p99/最大耗时。旧实现按
+改动前的代码内联在本文件中，仅作对照。
+
+用法（在 backend 目录下）::
+
+    python benchmarks/bench_keygen.py --runs 20
+"""
+
+import argparse
+import json
+import os
+import secrets
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bigint  # noqa: E402
+import fhe_service  # noqa: E402
+from percentiles import percentile  # noqa: E402
+
+_LEGACY_SMALL_PRIMES = [2, 3, 5, 7, 11, 13, 17, 19, 23]
+
+
+def _legacy_is_probable_prime(n: int, rounds: int = 8) -> bool:
+    if any(n % p == 0 for p in _LEGACY_SMALL_PRIMES):
+        return n in _LEGACY_SMALL_PRIMES
+    return bigint.is_prime(n, rounds)
+
+
+def legacy_generate_prime(bits: int) -> int:
+    while True:
+        candidate = secrets.randbits(bits)
+        candidate |= (1 << (bits - 1)) | 1
+        if _legacy_is_probable_prime(candidate):
+            return candidate
+
+
+def legacy_generate_safe_prime(bits: int) -> Tuple[int, int]:
+    while True:
+        q = legacy_generate_prime(bits - 1)
+        p = 2 * q + 1
+        if _legacy_is_probable_prime(p):
+            return p, q
+
+
+def bench(name: str, func: Callable[[], Any], runs: int) -> Dict[str, Any]:
+    timings: List[float] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "case": name,
+        "runs": runs,
+        "mean_ms": sum(timings) / runs,
+        "p50_ms": percentile(timings, 50),
+        "p90_ms": percentile(timings, 90),
+        "p99_ms": percentile(timings, 99),
+        "max_ms": max(timings),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20, help="每个用例的生成次数")
+    parser.add_argument("--prime-bits", type=int, default=1024, help="普通素数位数（Paillier 2048 的一半）")
+    parser.add_argument("--safe-bits", type=int, default=384, help="ElGamal 安全素数位数")
+    parser.add_argument("--legacy-runs", type=int, default=None, help="旧实现的生成次数，默认同 --runs")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args()
+    legacy_runs = args.legacy_runs or args.runs
+
+    prime_bits, safe_bits = args.prime_bits, args.safe_bits
+    results = [
+        bench(f"legacy prime {prime_bits}", lambda: legacy_generate_prime(prime_bits), legacy_runs),
+        bench(f"sieved prime {prime_bits}", lambda: fhe_service._generate_prime(prime_bits), args.runs),
+        bench(f"legacy safe {safe_bits}", lambda: legacy_generate_safe_prime(safe_bits), legacy_runs),
+        bench(f"sieved safe {safe_bits}", lambda: fhe_service._generate_safe_prime(safe_bits), args.runs),
+    ]
+
+    if args.json:
+        print(json.dumps({"backend": bigint.BACKEND, "results": results}, indent=2))
+        return
+    print(f"大整数后端: {bigint.BACKEND}")
+    print(f"{'case':<22}{'mean':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}  (ms)")
+    for r in results:
+        print(
+            f"{r['case']:<22}{r['mean_ms']:>10.1f}{r['p50_ms']:>10.1f}"
+            f"{r['p90_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['max_ms']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
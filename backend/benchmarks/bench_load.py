@@ -0,0 +1,366 @@
+"""WebSocket 与认证接口的本地压测工具。
+
+对运行中的服务（main.py，WebSocket 默认 8080，HTTP 默认 8081）启动
+--clients 个并发 WebSocket 客户端，每个客户端按 --mix 给出的权重随机
+选择请求，收到响应后立即发出下一个（闭环），直到 --duration 秒结束：
+
+- GET_FHE_KEY / GET_SERVER_TIME：读取公钥与服务器时间；
+- BATCH_ENCRYPT：加密 --batch-size 个随机数，密文与纪元留给 COMPUTE_FHE；
+- COMPUTE_FHE：对本客户端最近一批密文做同态计算，尚无密文时先加密一批；
+- MPC：依次发送 MPC_GENERATE_SECRET 与 MPC_COMPARE_INIT，分别统计。
+
+--auth-clients 另起若干 HTTP 客户端，注册后循环调用 /api/auth/profile，
+并按 --login-ratio 的比例重新登录。统计每种消息的吞吐与 p50/p95/p99 延迟，
+SERVER_BUSY 与 HTTP 503 计为 busy，其余失败计为 err。
+
+--rotate-at 在指定秒数时调用 /api/admin/rotate-keys 强制轮换密钥（服务端
+需设置 FHE_ADMIN_TOKEN，此处经 --admin-token 或同名环境变量提供），并分别
+统计轮换前后 --rotation-window 秒内的延迟与错误，以及 KEY_ROTATED 推送
+到达各客户端的延迟。
+
+用法（在 backend 目录下）::
+
+    FHE_ADMIN_TOKEN=secret python main.py
+    FHE_ADMIN_TOKEN=secret python benchmarks/bench_load.py --clients 20 --duration 60 --rotate-at 30
+    python benchmarks/bench_load.py --mix GET_SERVER_TIME=1 --clients 100 --auth-clients 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import secrets
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import websockets
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from percentiles import percentile  # noqa: E402
+
+MESSAGE_KINDS = ("GET_FHE_KEY", "BATCH_ENCRYPT", "COMPUTE_FHE", "GET_SERVER_TIME", "MPC")
+DEFAULT_MIX = "GET_FHE_KEY=2,BATCH_ENCRYPT=3,COMPUTE_FHE=3,GET_SERVER_TIME=1,MPC=1"
+
+# 请求类型 -> 成功时的响应类型
+RESPONSE_TYPES = {
+    "GET_FHE_KEY": "FHE_KEY",
+    "BATCH_ENCRYPT": "ENCRYPTED_BATCH",
+    "COMPUTE_FHE": "COMPUTE_RESULT",
+    "GET_SERVER_TIME": "SERVER_TIME",
+    "MPC_GENERATE_SECRET": "MPC_SECRET_GENERATED",
+    "MPC_COMPARE_INIT": "MPC_COMPARE_RESULT",
+}
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """解析 "GET_FHE_KEY=2,MPC=1" 形式的权重表，省略权重时记为 1。"""
+    mix: Dict[str, float] = {}
+    for part in filter(None, (item.strip() for item in text.split(","))):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip().upper()
+        if kind not in MESSAGE_KINDS:
+            raise ValueError(f"未知的消息类型: {kind}（可选 {', '.join(MESSAGE_KINDS)}）")
+        mix[kind] = float(weight) if weight else 1.0
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("消息权重之和必须大于 0")
+    return mix
+
+
+class Recorder:
+    """收集所有请求的 (开始时刻, 类型, 延迟毫秒, 结果)，时刻相对压测开始。"""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.samples: List[Tuple[float, str, float, str]] = []
+        self.errors: Counter = Counter()
+        self.pushes: List[float] = []
+
+    def now(self) -> float:
+        return time.perf_counter() - self.started
+
+    def record(self, kind: str, started: float, outcome: str, error: Optional[str] = None) -> None:
+        self.samples.append((started, kind, (self.now() - started) * 1000, outcome))
+        if error:
+            self.errors[f"{kind}: {error}"] += 1
+
+
+async def exchange(
+    ws: Any, recorder: Recorder, kind: str, request: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """发送一个请求并等待其响应；期间收到的 KEY_ROTATED 推送只记录到达时刻。"""
+    started = recorder.now()
+    await ws.send(json.dumps(request))
+    while True:
+        data = json.loads(await ws.recv())
+        if data.get("type") == "KEY_ROTATED":
+            recorder.pushes.append(recorder.now())
+            continue
+        break
+    if data.get("type") == RESPONSE_TYPES[kind]:
+        recorder.record(kind, started, "ok")
+        return data
+    if data.get("type") == "SERVER_BUSY":
+        recorder.record(kind, started, "busy")
+    else:
+        recorder.record(kind, started, "error", str(data.get("error") or data.get("type")))
+    return None
+
+
+async def ws_client(
+    index: int, args: argparse.Namespace, mix: Dict[str, float], recorder: Recorder, stop_at: float
+) -> None:
+    rng = random.Random(index)
+    kinds, weights = list(mix), list(mix.values())
+    # algorithm -> (纪元, 密文列表)，供 COMPUTE_FHE 使用
+    batches: Dict[str, Tuple[int, List[str]]] = {}
+
+    async def encrypt(algorithm: str) -> None:
+        values = [rng.randrange(1, 1000) for _ in range(args.batch_size)]
+        data = await exchange(
+            ws, recorder, "BATCH_ENCRYPT", {"type": "BATCH_ENCRYPT", "algorithm": algorithm, "values": values}
+        )
+        if data is not None:
+            batches[algorithm] = (data["epoch"], [item["ciphertext"] for item in data["items"]])
+
+    try:
+        async with websockets.connect(args.ws, max_size=None) as ws:
+            while recorder.now() < stop_at:
+                kind = rng.choices(kinds, weights)[0]
+                algorithm = rng.choice(args.algorithms)
+                if kind == "GET_FHE_KEY":
+                    await exchange(ws, recorder, kind, {"type": kind, "algorithm": algorithm})
+                elif kind == "GET_SERVER_TIME":
+                    await exchange(ws, recorder, kind, {"type": kind})
+                elif kind == "BATCH_ENCRYPT":
+                    await encrypt(algorithm)
+                elif kind == "COMPUTE_FHE":
+                    if algorithm not in batches:
+                        await encrypt(algorithm)
+                        continue
+                    epoch, ciphertexts = batches[algorithm]
+                    request = {"type": kind, "algorithm": algorithm, "ciphertexts": ciphertexts, "epoch": epoch}
+                    if await exchange(ws, recorder, kind, request) is None:
+                        # 纪元可能已超出宽限期，下次重新加密
+                        batches.pop(algorithm, None)
+                else:
+                    await exchange(ws, recorder, "MPC_GENERATE_SECRET", {"type": "MPC_GENERATE_SECRET"})
+                    value = rng.randrange(1_000_000, 10_000_000)
+                    await exchange(ws, recorder, "MPC_COMPARE_INIT", {"type": "MPC_COMPARE_INIT", "value": value})
+                if args.think_time:
+                    await asyncio.sleep(args.think_time / 1000)
+    except (OSError, websockets.exceptions.WebSocketException) as exc:
+        recorder.record("CONNECTION", recorder.now(), "error", type(exc).__name__)
+
+
+async def auth_client(index: int, args: argparse.Namespace, session: Any, recorder: Recorder, stop_at: float) -> None:
+    rng = random.Random(-index - 1)
+    base = args.http.rstrip("/")
+    credentials = {"username": f"load_{args.run_id}_{index}", "password": "load-test-password"}
+
+    async def login() -> Optional[str]:
+        started = recorder.now()
+        async with session.post(f"{base}/api/auth/login", json=credentials) as resp:
+            body = await resp.json()
+        outcome = "ok" if resp.status == 200 else "busy" if resp.status == 503 else "error"
+        recorder.record("AUTH_LOGIN", started, outcome, None if outcome != "error" else f"HTTP {resp.status}")
+        return body.get("token") if resp.status == 200 else None
+
+    async with session.post(f"{base}/api/auth/register", json=credentials) as resp:
+        await resp.read()
+    token = await login()
+    while recorder.now() < stop_at:
+        if token is None or rng.random() < args.login_ratio:
+            token = await login() or token
+            continue
+        started = recorder.now()
+        headers = {"Authorization": f"Bearer {token}"}
+        async with session.get(f"{base}/api/auth/profile", headers=headers) as resp:
+            await resp.read()
+        outcome = "ok" if resp.status == 200 else "busy" if resp.status == 503 else "error"
+        recorder.record("AUTH_PROFILE", started, outcome, None if outcome != "error" else f"HTTP {resp.status}")
+        if args.think_time:
+            await asyncio.sleep(args.think_time / 1000)
+
+
+async def rotate_keys(args: argparse.Namespace, recorder: Recorder) -> Dict[str, Any]:
+    from aiohttp import ClientSession
+
+    await asyncio.sleep(max(0.0, args.rotate_at - recorder.now()))
+    started = recorder.now()
+    headers = {"X-Admin-Token": args.admin_token}
+    async with ClientSession() as session:
+        async with session.post(f"{args.http.rstrip('/')}/api/admin/rotate-keys", headers=headers) as resp:
+            body = await resp.json()
+            status = resp.status
+    return {"requested_at": started, "completed_at": recorder.now(), "status": status, **body}
+
+
+def summarize(samples: List[Tuple[float, str, float, str]], elapsed: float) -> List[Dict[str, Any]]:
+    by_kind: Dict[str, List[Tuple[float, str]]] = {}
+    for _, kind, latency, outcome in samples:
+        by_kind.setdefault(kind, []).append((latency, outcome))
+    rows = []
+    for kind in sorted(by_kind):
+        entries = by_kind[kind]
+        outcomes = Counter(outcome for _, outcome in entries)
+        latencies = [latency for latency, outcome in entries if outcome == "ok"] or [0.0]
+        rows.append(
+            {
+                "type": kind,
+                "requests": len(entries),
+                "ok": outcomes["ok"],
+                "busy": outcomes["busy"],
+                "errors": outcomes["error"],
+                "req_per_sec": len(entries) / elapsed if elapsed else 0.0,
+                "p50_ms": percentile(latencies, 50),
+                "p95_ms": percentile(latencies, 95),
+                "p99_ms": percentile(latencies, 99),
+                "max_ms": max(latencies),
+            }
+        )
+    return rows
+
+
+def rotation_report(
+    recorder: Recorder, rotation: Dict[str, Any], window: float, clients: int
+) -> Dict[str, Any]:
+    at = rotation["requested_at"]
+    before = [s for s in recorder.samples if at - window <= s[0] < at]
+    after = [s for s in recorder.samples if at <= s[0] < at + window]
+    # 服务端在回复 HTTP 之前就已推送，因此从发起轮换请求算起
+    delays = [(t - at) * 1000 for t in recorder.pushes if t >= at]
+    return {
+        **rotation,
+        "window_s": window,
+        "before": summarize(before, window),
+        "after": summarize(after, window),
+        "pushes_received": len(delays),
+        "clients": clients,
+        # 推送在客户端下一次读取时才被取出，延迟还包含客户端自身在途请求的时间
+        "push_delay_p50_ms": percentile(delays, 50) if delays else None,
+        "push_delay_max_ms": max(delays) if delays else None,
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    recorder = Recorder()
+    stop_at = args.duration
+    tasks = [ws_client(i, args, mix, recorder, stop_at) for i in range(args.clients)]
+    rotation_task = asyncio.ensure_future(rotate_keys(args, recorder)) if args.rotate_at is not None else None
+
+    session = None
+    if args.auth_clients:
+        from aiohttp import ClientSession, TCPConnector
+
+        session = ClientSession(connector=TCPConnector(limit=args.auth_clients))
+        tasks += [auth_client(i, args, session, recorder, stop_at) for i in range(args.auth_clients)]
+    try:
+        await asyncio.gather(*tasks)
+        rotation = await rotation_task if rotation_task is not None else None
+    finally:
+        if session is not None:
+            await session.close()
+    elapsed = recorder.now()
+
+    report: Dict[str, Any] = {
+        "config": {
+            "ws": args.ws,
+            "clients": args.clients,
+            "auth_clients": args.auth_clients,
+            "mix": mix,
+            "algorithms": args.algorithms,
+            "batch_size": args.batch_size,
+            "duration_s": args.duration,
+        },
+        "elapsed_s": elapsed,
+        "results": summarize(recorder.samples, elapsed),
+        "errors": dict(recorder.errors.most_common(20)),
+    }
+    if rotation is not None:
+        report["rotation"] = rotation_report(recorder, rotation, args.rotation_window, args.clients)
+    return report
+
+
+def _print_table(rows: List[Dict[str, Any]]) -> None:
+    print(
+        f"{'type':<22}{'reqs':>7}{'ok':>7}{'busy':>6}{'err':>6}{'req/s':>9}"
+        f"{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)"
+    )
+    for r in rows:
+        print(
+            f"{r['type']:<22}{r['requests']:>7}{r['ok']:>7}{r['busy']:>6}{r['errors']:>6}"
+            f"{r['req_per_sec']:>9.1f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}"
+            f"{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ws", default="ws://127.0.0.1:8080", help="WebSocket 服务地址")
+    parser.add_argument("--http", default="http://127.0.0.1:8081", help="HTTP API 地址")
+    parser.add_argument("--clients", type=int, default=10, help="并发 WebSocket 客户端数")
+    parser.add_argument("--duration", type=float, default=30.0, help="压测时长（秒）")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="消息类型权重，如 GET_FHE_KEY=2,MPC=1")
+    parser.add_argument(
+        "--algorithms",
+        nargs="+",
+        default=["PAILLIER", "ELGAMAL", "EC_ELGAMAL"],
+        help="加密与计算请求随机使用的算法",
+    )
+    parser.add_argument("--batch-size", type=int, default=4, help="BATCH_ENCRYPT 每批的数值个数")
+    parser.add_argument("--think-time", type=float, default=0.0, help="客户端两次请求之间的间隔（毫秒）")
+    parser.add_argument("--auth-clients", type=int, default=0, help="并发 HTTP 认证客户端数")
+    parser.add_argument("--login-ratio", type=float, default=0.05, help="认证客户端请求中重新登录的比例")
+    parser.add_argument("--rotate-at", type=float, default=None, help="在第几秒强制轮换密钥")
+    parser.add_argument("--rotation-window", type=float, default=10.0, help="轮换前后各统计多少秒")
+    parser.add_argument(
+        "--admin-token", default=os.environ.get("FHE_ADMIN_TOKEN", ""), help="管理接口令牌"
+    )
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args()
+    args.algorithms = [algorithm.upper() for algorithm in args.algorithms]
+    args.run_id = secrets.token_hex(3)
+    try:
+        parse_mix(args.mix)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if args.rotate_at is not None and not args.admin_token:
+        parser.error("--rotate-at 需要 --admin-token 或环境变量 FHE_ADMIN_TOKEN")
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+    print(f"{args.clients} 个 WebSocket 客户端，{args.auth_clients} 个认证客户端，{report['elapsed_s']:.1f} 秒")
+    _print_table(report["results"])
+    rotation = report.get("rotation")
+    if rotation:
+        print(
+            f"\n第 {rotation['requested_at']:.1f} 秒强制轮换密钥：HTTP {rotation['status']}，"
+            f"纪元 {rotation.get('epoch')}，服务端耗时 {rotation.get('elapsed_ms')} ms"
+        )
+        print(f"轮换前 {rotation['window_s']:.0f} 秒：")
+        _print_table(rotation["before"])
+        print(f"轮换后 {rotation['window_s']:.0f} 秒：")
+        _print_table(rotation["after"])
+        if rotation["push_delay_p50_ms"] is not None:
+            print(
+                f"KEY_ROTATED 推送：{rotation['pushes_received']}/{rotation['clients']} 个客户端收到，"
+                f"自发起轮换起 p50 {rotation['push_delay_p50_ms']:.1f} ms，"
+                f"最大 {rotation['push_delay_max_ms']:.1f} ms"
+            )
+        else:
+            print("KEY_ROTATED 推送：压测期间未收到")
+    if report["errors"]:
+        print("\n主要错误：")
+        for message, count in report["errors"].items():
+            print(f"  {count:>6}  {message}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""user_sessions 写入方式对比。
+
+在临时数据库中分别测量（不触碰 crypto_lab.db）：
+
+- 登录记录：逐条 INSERT + 提交（改动前的写法）与 session_tracker 批量写回；
+- 活动更新：每次令牌校验都 UPDATE last_activity 与按周期合并后批量更新，
+  --active-tokens 个令牌轮流被使用，每 --flush-every 次操作写回一次；
+- 保留清理：预置 --aged 行过期会话，对比一次性 DELETE 与按 prune_batch
+  增量清理的单事务最长耗时（即写锁最长持有时间）。
+
+用法（在 backend 目录下）::
+
+    python benchmarks/bench_sessions.py --logins 5000 --touches 50000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+from session_tracker import SessionTracker  # noqa: E402
+
+
+def _timed(label: str, ops: int, body: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    extra = body()
+    elapsed = time.perf_counter() - started
+    return {"case": label, "ops": ops, "ops_per_sec": ops / elapsed, "total_ms": elapsed * 1000, **extra}
+
+
+def _tracker(args: argparse.Namespace) -> SessionTracker:
+    # 后台线程周期足够长，由测试按固定操作数调用 flush，结果可复现
+    return SessionTracker(
+        lambda: database.get_pool().connection(),
+        flush_interval=3600.0,
+        max_batch=args.flush_every + 1,
+        retention_days=0,
+    )
+
+
+def _direct(sql: str, rows: List[tuple]) -> Dict[str, Any]:
+    worst = 0.0
+    with database.get_pool().connection() as conn:
+        for row in rows:
+            started = time.perf_counter()
+            conn.execute(sql, row)
+            conn.commit()
+            worst = max(worst, time.perf_counter() - started)
+    return {"transactions": len(rows), "rows_written": len(rows), "max_txn_ms": worst * 1000}
+
+
+def _write_behind(tracker: SessionTracker, calls: List[Callable[[], None]], flush_every: int) -> Dict[str, Any]:
+    for index, call in enumerate(calls, start=1):
+        call()
+        if index % flush_every == 0:
+            tracker.flush()
+    tracker.flush()
+    metrics = tracker.metrics()
+    return {
+        "transactions": metrics["flushes"],
+        "rows_written": metrics["inserted"] + metrics["touched"],
+        "max_txn_ms": metrics["max_flush_ms"],
+    }
+
+
+def bench_logins(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    rows = [(i % 100 + 1, f"direct-{i}", "127.0.0.1") for i in range(args.logins)]
+    results = [
+        _timed(
+            "direct insert",
+            args.logins,
+            lambda: _direct("INSERT INTO user_sessions (user_id, token, ip_address) VALUES (?, ?, ?)", rows),
+        )
+    ]
+    tracker = _tracker(args)
+    calls = [
+        (lambda i=i: tracker.record_login(i % 100 + 1, f"behind-{i}", "127.0.0.1"))
+        for i in range(args.logins)
+    ]
+    results.append(
+        _timed("write-behind insert", args.logins, lambda: _write_behind(tracker, calls, args.flush_every))
+    )
+    return results
+
+
+def bench_touches(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    tokens = [f"direct-{i}" for i in range(args.active_tokens)]
+    rows = [("2030-01-01 00:00:00", tokens[i % len(tokens)]) for i in range(args.touches)]
+    results = [
+        _timed(
+            "direct touch",
+            args.touches,
+            lambda: _direct("UPDATE user_sessions SET last_activity = ? WHERE token = ?", rows),
+        )
+    ]
+    tracker = _tracker(args)
+    calls = [(lambda i=i: tracker.touch(tokens[i % len(tokens)])) for i in range(args.touches)]
+    results.append(
+        _timed("write-behind touch", args.touches, lambda: _write_behind(tracker, calls, args.flush_every))
+    )
+    return results
+
+
+def _seed_aged(count: int, prefix: str) -> None:
+    with database.get_pool().connection() as conn:
+        conn.executemany(
+            """INSERT INTO user_sessions (user_id, token, login_time, last_activity)
+               VALUES (?, ?, datetime('now', '-90 days'), datetime('now', '-90 days'))""",
+            [(i % 100 + 1, f"{prefix}-{i}") for i in range(count)],
+        )
+        conn.commit()
+
+
+def bench_prune(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    _seed_aged(args.aged, "aged-a")
+
+    def delete_all() -> Dict[str, Any]:
+        with database.get_pool().connection() as conn:
+            cursor = conn.execute("DELETE FROM user_sessions WHERE last_activity < datetime('now', '-30 days')")
+            conn.commit()
+        return {"transactions": 1, "rows_written": cursor.rowcount}
+
+    results = [_timed("prune all", args.aged, delete_all)]
+    results[0]["max_txn_ms"] = results[0]["total_ms"]
+
+    _seed_aged(args.aged, "aged-b")
+    tracker = SessionTracker(
+        lambda: database.get_pool().connection(), retention_days=30, prune_batch=args.prune_batch
+    )
+
+    def incremental() -> Dict[str, Any]:
+        while tracker.pruned < args.aged:
+            tracker.flush()
+        metrics = tracker.metrics()
+        return {
+            "transactions": metrics["flushes"],
+            "rows_written": metrics["pruned"],
+            "max_txn_ms": metrics["max_flush_ms"],
+        }
+
+    results.append(_timed("prune incremental", args.aged, incremental))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=5000, help="登录记录条数")
+    parser.add_argument("--touches", type=int, default=50000, help="令牌校验（活动更新）次数")
+    parser.add_argument("--active-tokens", type=int, default=200, help="活跃令牌数")
+    parser.add_argument("--flush-every", type=int, default=2000, help="写回模式下每多少次操作提交一次")
+    parser.add_argument("--aged", type=int, default=20000, help="预置的过期会话行数")
+    parser.add_argument("--prune-batch", type=int, default=500, help="增量清理每批删除的行数")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench_sessions.db")
+        database.init_db()
+        try:
+            results = bench_logins(args) + bench_touches(args) + bench_prune(args)
+        finally:
+            database.get_pool().close()
+
+    if args.json:
+        print(json.dumps({"results": results}, indent=2))
+        return
+    print(f"{'case':<22}{'ops':>8}{'txns':>8}{'rows':>8}{'ops/s':>10}{'total ms':>10}{'max txn ms':>12}")
+    for r in results:
+        print(
+            f"{r['case']:<22}{r['ops']:>8}{r['transactions']:>8}{r['rows_written']:>8}"
+            f"{r['ops_per_sec']:>10.0f}{r['total_ms']:>10.1f}{r['max_txn_ms']:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+"""引擎微基准套件：密钥生成、加密与同态计算吞吐、JSON 序列化开销。
+
+对 fhe_service 的每个引擎（以及 paillier_service 基于 phe 的旧实现，记为
+PHE）按 KEY_SIZES 中的模数位数分别测量：
+
+- keygen：生成一次密钥的中位耗时（素数搜索随机性大，至少重复 5 次且累计
+  2 秒）；
+- encrypt：每批 --batch-sizes 个数值的加密吞吐；
+- compute：同态合并一批密文并解密的吞吐（按密文个数计）；
+- json：ENCRYPTED_BATCH 消息与计算结果的 JSON 编码、解码耗时及字节数。
+
+吞吐与序列化用例分 --samples 段共执行约 --min-time 秒，取最快的一段。
+Paillier 的混淆因子池关闭，测逐个计算的稳态开销；EC-ElGamal 的进程级
+预计算表提前构建，不计入密钥生成。
+
+结果可用 --output 写成 JSON，--save-baseline 保存为基线，之后的运行自动
+与基线比较，变慢超过 --threshold（密钥生成为 --keygen-threshold）的用例
+标记为回归并以退出码 1 结束。共享虚拟机上两次完整运行之间，微秒级用例
+的差异可达 20%~40%；--repeat N 把整套用例跑 N 遍、每个用例取最好的一次，
+保存基线与做回归判断时建议使用。宿主机负载变化常让所有用例一起变慢，
+因此默认先求全部用例变慢倍数的中位数（整体漂移），各用例除以该漂移后再
+与阈值比较；整体漂移本身超过 --threshold 时同样以退出码 1 结束（大整数
+后端或 powmod 变慢这类全局性回归只会表现为整体漂移），可用 --absolute
+按绝对变化逐个用例复核。
+基线记录了大整数后端与 Python 版本，与当前环境不一致时只给出提示。
+
+用法（在 backend 目录下）::
+
+    python benchmarks/bench_suite.py --quick --repeat 3 --save-baseline
+    python benchmarks/bench_suite.py --quick --repeat 3 --output results.json
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bigint  # noqa: E402
+import p256  # noqa: E402
+import paillier_service  # noqa: E402
+from percentiles import percentile  # noqa: E402
+from fhe_service import ENGINE_CLASSES, ECElGamalEngine  # noqa: E402
+
+# 每个引擎测量的模数位数，--quick 只测第一个；EC-ElGamal 固定为 P-256
+KEY_SIZES: Dict[str, List[int]] = {
+    "PAILLIER": [1024, 2048],
+    "RSA": [1024, 2048],
+    "ELGAMAL": [256, 384],
+    "DAMGARD_JURIK": [1024, 2048],
+    "EC_ELGAMAL": [256],
+    "PHE": [1024, 2048],
+}
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def _best_time(func: Callable[[], Any], min_time: float, samples: int) -> float:
+    """返回 func 单次执行的秒数。
+
+    与 timeit 相同，计时期间关闭垃圾回收；总时间分成 samples 段，每段循环
+    执行直到超过 min_time / samples（至少一次），取单次耗时最短的一段，
+    排除调度与其他进程带来的抖动。
+    """
+    budget = min_time / samples
+    best = float("inf")
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(samples):
+            runs, elapsed = 0, 0.0
+            while runs == 0 or elapsed < budget:
+                start = time.perf_counter()
+                func()
+                elapsed += time.perf_counter() - start
+                runs += 1
+            best = min(best, elapsed / runs)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return best
+
+
+def _record(
+    group: str, case: str, metric: str, value: float, higher_is_better: bool, **extra: Any
+) -> Dict[str, Any]:
+    return {
+        "id": f"{group}/{case}",
+        "group": group,
+        "case": case,
+        "metric": metric,
+        "value": value,
+        "higher_is_better": higher_is_better,
+        **extra,
+    }
+
+
+class _PheEngine:
+    """把 paillier_service 的模块级接口包装成与引擎相同的调用方式。"""
+
+    name = "PHE"
+
+    def __init__(self, bit_length: int) -> None:
+        # init_paillier_keys 会打印进度，基准输出中屏蔽
+        with contextlib.redirect_stdout(io.StringIO()):
+            paillier_service.init_paillier_keys(bit_length)
+
+    def encrypt_raw(self, values: List[int]) -> List[Tuple[int, str]]:
+        return [(value, paillier_service.encrypt_value(value)) for value in values]
+
+    def aggregate_raw(self, ciphertexts: List[str]) -> List[str]:
+        return ciphertexts
+
+    def finalize_raw(self, acc: List[str]) -> Tuple[str, int]:
+        result = paillier_service.compute_with_server_key(acc, return_plaintext=True)
+        return result["ciphertext"], result["plaintext"]
+
+    def encode_ciphertext(self, ciphertext: str) -> str:
+        return ciphertext
+
+    def decode_ciphertext(self, payload: str) -> str:
+        return payload
+
+    def close(self) -> None:
+        pass
+
+
+def _make_engine(name: str, bits: int) -> Any:
+    if name == "PHE":
+        return _PheEngine(bits)
+    if name == "EC_ELGAMAL":
+        return ECElGamalEngine()
+    engine = ENGINE_CLASSES[name](bits)
+    if name == "PAILLIER":
+        engine.close()
+    return engine
+
+
+def bench_keygen(name: str, bits: int, runs: int, min_time: float) -> Tuple[Dict[str, Any], Any]:
+    timings: List[float] = []
+    engine = None
+    while len(timings) < runs or sum(timings) < min_time * 1000:
+        if engine is not None:
+            engine.close()
+        start = time.perf_counter()
+        engine = _make_engine(name, bits)
+        timings.append((time.perf_counter() - start) * 1000)
+    record = _record(
+        "keygen",
+        f"{name}-{bits}",
+        "median_ms",
+        percentile(timings, 50),
+        False,
+        runs=len(timings),
+        p90_ms=percentile(timings, 90),
+        max_ms=max(timings),
+    )
+    return record, engine
+
+
+def bench_throughput(
+    engine: Any, label: str, batch_sizes: List[int], min_time: float, samples: int
+) -> Tuple[List[Dict[str, Any]], List[Tuple[int, Any]]]:
+    """返回吞吐记录以及最大批次的 (明文, 密文) 列表，供序列化测量复用。"""
+    results: List[Dict[str, Any]] = []
+    pairs: List[Tuple[int, Any]] = []
+    for batch in batch_sizes:
+        values = [i % 7 + 1 for i in range(batch)]
+        box: Dict[str, Any] = {}
+
+        def encrypt() -> None:
+            box["pairs"] = engine.encrypt_raw(values)
+
+        elapsed = _best_time(encrypt, min_time, samples)
+        results.append(_record("encrypt", f"{label}/b{batch}", "ops_per_sec", batch / elapsed, True, batch=batch))
+
+        pairs = box["pairs"]
+        ciphertexts = [ciphertext for _, ciphertext in pairs]
+        elapsed = _best_time(lambda: engine.finalize_raw(engine.aggregate_raw(ciphertexts)), min_time, samples)
+        results.append(
+            _record(
+                "compute",
+                f"{label}/b{batch}",
+                "ops_per_sec",
+                batch / elapsed,
+                True,
+                batch=batch,
+                batch_ms=elapsed * 1000,
+            )
+        )
+    return results, pairs
+
+
+def bench_json(
+    engine: Any, label: str, pairs: List[Tuple[int, Any]], min_time: float, samples: int
+) -> List[Dict[str, Any]]:
+    header = {"type": "ENCRYPTED_BATCH", "algorithm": engine.name}
+
+    def encode_batch() -> str:
+        items = [
+            {"original": original, "ciphertext": engine.encode_ciphertext(ciphertext)}
+            for original, ciphertext in pairs
+        ]
+        return json.dumps({**header, "items": items})
+
+    frame = encode_batch()
+
+    def decode_batch() -> List[Any]:
+        return [engine.decode_ciphertext(item["ciphertext"]) for item in json.loads(frame)["items"]]
+
+    ciphertext, plaintext = engine.finalize_raw(engine.aggregate_raw([c for _, c in pairs]))
+
+    def encode_result() -> str:
+        return json.dumps(
+            {
+                "type": "COMPUTE_RESULT",
+                "algorithm": engine.name,
+                "ciphertext": engine.encode_ciphertext(ciphertext),
+                "plaintext": plaintext,
+            }
+        )
+
+    count = len(pairs)
+    results = []
+    for case, func, per in (
+        ("batch encode", encode_batch, count),
+        ("batch decode", decode_batch, count),
+        ("result encode", encode_result, 1),
+    ):
+        elapsed = _best_time(func, min_time, samples)
+        results.append(
+            _record(
+                "json",
+                f"{label}/{case}",
+                "us_per_item",
+                elapsed / per * 1e6,
+                False,
+                bytes_per_item=len(frame.encode("utf-8")) / count if per == count else len(encode_result()),
+            )
+        )
+    return results
+
+
+def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    # EC-ElGamal 的固定底数表与小步大步表每进程构建一次，不计入密钥生成
+    p256.base_table()
+    p256.dlog_table(ECElGamalEngine.baby_steps)
+
+    results: List[Dict[str, Any]] = []
+    for name in args.engines:
+        sizes = KEY_SIZES[name][:1] if args.quick else KEY_SIZES[name]
+        for bits in sizes:
+            label = f"{name}-{bits}"
+            record, engine = bench_keygen(name, bits, args.keygen_runs, args.keygen_time)
+            results.append(record)
+            throughput, pairs = bench_throughput(engine, label, args.batch_sizes, args.min_time, args.samples)
+            results.extend(throughput)
+            results.extend(bench_json(engine, label, pairs, args.min_time, args.samples))
+            engine.close()
+    return results
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "backend": bigint.BACKEND,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def best_of(runs: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """合并多遍运行的结果，每个用例保留最好的一次。"""
+    best: Dict[str, Dict[str, Any]] = {}
+    for results in runs:
+        for record in results:
+            current = best.get(record["id"])
+            if current is None:
+                best[record["id"]] = record
+            elif (record["value"] > current["value"]) == record["higher_is_better"]:
+                best[record["id"]] = record
+    return list(best.values())
+
+
+def compare(
+    results: List[Dict[str, Any]],
+    baseline: Dict[str, Any],
+    threshold: float,
+    keygen_threshold: float,
+    absolute: bool = False,
+) -> Tuple[List[Dict[str, Any]], float]:
+    """在每条结果上写入相对基线的变化，返回 (回归的用例, 整体漂移)。
+
+    slowdown 为变慢的倍数（吞吐类取 基线/当前，耗时类取 当前/基线）。
+    整体漂移取非密钥生成用例 slowdown 的中位数，relative = slowdown / 漂移，
+    relative 大于 1 + 阈值即为回归；absolute 为 True 时漂移固定为 1。
+    """
+    previous = {record["id"]: record for record in baseline.get("results", [])}
+    compared = []
+    for record in results:
+        base = previous.get(record["id"])
+        if base is None or base["metric"] != record["metric"] or not base["value"] or not record["value"]:
+            continue
+        if record["higher_is_better"]:
+            slowdown = base["value"] / record["value"]
+        else:
+            slowdown = record["value"] / base["value"]
+        record["baseline"] = base["value"]
+        record["slowdown"] = slowdown
+        compared.append(record)
+
+    # 密钥生成受素数搜索的随机性影响大，不参与漂移估计
+    ratios = sorted(record["slowdown"] for record in compared if record["group"] != "keygen")
+    drift = 1.0 if absolute or not ratios else ratios[len(ratios) // 2]
+    regressions = []
+    for record in compared:
+        limit = keygen_threshold if record["group"] == "keygen" else threshold
+        record["relative"] = record["slowdown"] / drift
+        record["regressed"] = record["relative"] > 1 + limit
+        if record["regressed"]:
+            regressions.append(record)
+    return regressions, drift
+
+
+def _environment_mismatch(current: Dict[str, Any], stored: Dict[str, Any]) -> List[str]:
+    return [
+        f"{key}: {stored.get(key)} -> {current.get(key)}"
+        for key in ("backend", "python", "machine", "cpus")
+        if stored.get(key) != current.get(key)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--engines", nargs="+", default=list(KEY_SIZES), choices=list(KEY_SIZES), help="要测量的引擎"
+    )
+    parser.add_argument("--quick", action="store_true", help="每个引擎只测最小的模数位数")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 64], help="加密与计算的批大小")
+    parser.add_argument("--keygen-runs", type=int, default=5, help="每种密钥生成的最少重复次数")
+    parser.add_argument("--keygen-time", type=float, default=2.0, help="每种密钥生成的最短累计时间（秒）")
+    parser.add_argument("--min-time", type=float, default=0.5, help="每个吞吐用例的总测量时间（秒）")
+    parser.add_argument("--samples", type=int, default=5, help="每个吞吐用例的分段数，取最快的一段")
+    parser.add_argument("--output", default=None, help="把结果写入该 JSON 文件")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线文件路径")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果保存为基线")
+    parser.add_argument("--threshold", type=float, default=0.25, help="吞吐与序列化用例的回归阈值")
+    parser.add_argument("--keygen-threshold", type=float, default=0.5, help="密钥生成用例的回归阈值")
+    parser.add_argument("--repeat", type=int, default=1, help="整套用例运行的遍数，每个用例取最好的一次")
+    parser.add_argument("--absolute", action="store_true", help="不扣除整体漂移，直接按绝对变化判断回归")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args()
+
+    results = best_of([run(args) for _ in range(max(1, args.repeat))])
+    report: Dict[str, Any] = {"environment": {**environment(), "repeat": args.repeat}, "results": results}
+
+    regressions: List[Dict[str, Any]] = []
+    notes: List[str] = []
+    drift = 1.0
+    drifted = False
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        stored = baseline.get("environment", {})
+        regressions, drift = compare(
+            report["results"], baseline, args.threshold, args.keygen_threshold, args.absolute
+        )
+        drifted = drift > 1 + args.threshold
+        notes = _environment_mismatch(report["environment"], stored)
+        report["baseline"] = {
+            "path": args.baseline,
+            "created_at": stored.get("created_at"),
+            "drift": drift,
+            "drift_regressed": drifted,
+            "environment_mismatch": notes,
+            "regressions": [record["id"] for record in regressions],
+        }
+
+    for path in filter(None, (args.output, args.baseline if args.save_baseline else None)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print(f"大整数后端: {bigint.BACKEND}")
+        print(f"{'id':<40}{'metric':>13}{'value':>12}{'baseline':>12}{'change':>9}")
+        for r in report["results"]:
+            if "baseline" in r:
+                change = f"{(1 / r['relative'] - 1) * 100:+.0f}%"
+                base = f"{r['baseline']:.1f}"
+            else:
+                change = base = "-"
+            flag = "  REGRESSED" if r.get("regressed") else ""
+            print(f"{r['id']:<40}{r['metric']:>13}{r['value']:>12.1f}{base:>12}{change:>9}{flag}")
+        if args.save_baseline:
+            print(f"基线已保存到 {args.baseline}")
+        elif "baseline" not in report:
+            print(f"未找到基线 {args.baseline}，可用 --save-baseline 生成")
+        for note in notes:
+            print(f"注意：运行环境与基线不同（{note}），比较结果仅供参考")
+        if "baseline" in report and not args.absolute:
+            print(f"整体漂移 {(1 / drift - 1) * 100:+.0f}%，change 列已扣除整体漂移")
+        if drifted:
+            print("整体变慢超过阈值：可能是全局性回归，也可能是机器负载变化，可用 --absolute 复核")
+        if regressions:
+            print(f"{len(regressions)} 个用例相对基线变慢超过阈值")
+    if regressions or drifted:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""对比 JSON 十进制字符串与二进制定长帧两种线格式的序列化开销。
+
+用法（在 backend 目录下）::
+
+    python benchmarks/bench_wire.py --count 1000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import wire_format  # noqa: E402
+from fhe_service import ElGamalEngine, PaillierEngine, RSAEngine  # noqa: E402
+
+
+def _best_of(func: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_engine(engine: Any, count: int, repeat: int) -> Dict[str, Any]:
+    pairs = engine.encrypt_raw(range(1, count + 1))
+    header = {"type": "ENCRYPTED_BATCH", "algorithm": engine.name}
+
+    def json_encode() -> str:
+        items = [
+            {"original": original, "ciphertext": engine.encode_ciphertext(ciphertext)}
+            for original, ciphertext in pairs
+        ]
+        return json.dumps({**header, "items": items})
+
+    def binary_encode() -> bytes:
+        return wire_format.encode_encrypted_batch(header, engine, pairs)
+
+    json_frame = json_encode()
+    binary_frame = binary_encode()
+
+    def json_decode() -> List[Any]:
+        data = json.loads(json_frame)
+        return [engine.decode_ciphertext(item["ciphertext"]) for item in data["items"]]
+
+    def binary_decode() -> List[Any]:
+        _, blobs = wire_format.decode_frame(binary_frame)
+        return engine.unpack_ciphertexts(blobs[0])
+
+    assert json_decode() == binary_decode()
+    result = {
+        "engine": engine.name,
+        "count": count,
+        "json_bytes": len(json_frame.encode("utf-8")),
+        "binary_bytes": len(binary_frame),
+        "json_encode_ms": _best_of(json_encode, repeat) * 1000,
+        "binary_encode_ms": _best_of(binary_encode, repeat) * 1000,
+        "json_decode_ms": _best_of(json_decode, repeat) * 1000,
+        "binary_decode_ms": _best_of(binary_decode, repeat) * 1000,
+    }
+    result["size_ratio"] = result["json_bytes"] / result["binary_bytes"]
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000, help="每个引擎的密文数量")
+    parser.add_argument("--repeat", type=int, default=5, help="取最优值的重复次数")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args()
+
+    engines = [PaillierEngine(2048), RSAEngine(1024), ElGamalEngine(384)]
+    results = [bench_engine(engine, args.count, args.repeat) for engine in engines]
+    for engine in engines:
+        engine.close()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(
+        f"{'engine':<10}{'json KB':>10}{'bin KB':>10}{'ratio':>7}"
+        f"{'json enc':>10}{'bin enc':>10}{'json dec':>10}{'bin dec':>10}  (ms)"
+    )
+    for r in results:
+        print(
+            f"{r['engine']:<10}{r['json_bytes'] / 1024:>10.1f}{r['binary_bytes'] / 1024:>10.1f}"
+            f"{r['size_ratio']:>7.2f}{r['json_encode_ms']:>10.2f}{r['binary_encode_ms']:>10.2f}"
+            f"{r['json_decode_ms']:>10.2f}{r['binary_decode_ms']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
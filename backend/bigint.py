@@ -0,0 +1,70 @@
+"""大整数运算后端。
+
+安装了 gmpy2 时，powmod / invert / is_prime 交给 GMP 执行；否则使用 CPython
+内置整数。所有函数都接受并返回 Python int，切换后端不影响序列化与协议。
+"""
+
+import secrets
+
+try:
+    import gmpy2
+
+    HAS_GMPY2 = True
+except ImportError:
+    HAS_GMPY2 = False
+
+
+def _miller_rabin(n: int, rounds: int) -> bool:
+    d = n - 1
+    r = 0
+    while d % 2 == 0:
+        d //= 2
+        r += 1
+
+    for _ in range(rounds):
+        a = secrets.randbelow(n - 3) + 2
+        x = pow(a, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(r - 1):
+            x = pow(x, 2, n)
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+if HAS_GMPY2:
+    BACKEND = f"gmpy2 {gmpy2.version()}"
+
+    def powmod(base: int, exponent: int, modulus: int) -> int:
+        return int(gmpy2.powmod(base, exponent, modulus))
+
+    def invert(value: int, modulus: int) -> int:
+        try:
+            return int(gmpy2.invert(value, modulus))
+        except ZeroDivisionError:
+            raise ValueError("模逆元不存在") from None
+
+    def is_prime(n: int, rounds: int = 8) -> bool:
+        """奇数 n 的概率素性检验。"""
+        return bool(gmpy2.is_prime(n, rounds))
+
+else:
+    BACKEND = "python"
+
+    def powmod(base: int, exponent: int, modulus: int) -> int:
+        return pow(base, exponent, modulus)
+
+    def invert(value: int, modulus: int) -> int:
+        try:
+            return pow(value, -1, modulus)
+        except ValueError:
+            raise ValueError("模逆元不存在") from None
+
+    def is_prime(n: int, rounds: int = 8) -> bool:
+        """奇数 n 的概率素性检验。"""
+        if n < 5:
+            return n in (2, 3)
+        return _miller_rabin(n, rounds)
@@ -0,0 +1,159 @@
+"""面向大量 WebSocket 连接的广播子系统。
+
+广播时消息只序列化一次。发送缓冲区空闲的连接按 ``websockets.broadcast``
+的方式同步写入传输层，不创建任何协程；发送缓冲区积压超过 ``max_buffered``
+字节、或仍有待发消息的连接，消息进入该连接的有界队列，由按需创建的发送
+协程排空。队列溢出时按策略丢弃最旧消息或断开该慢速连接，单个卡住的连接
+不会拖慢其他客户端。
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+import websockets
+
+logger = logging.getLogger(__name__)
+
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_DISCONNECT = "disconnect"
+
+
+def _buffered(websocket: Any) -> int:
+    transport = getattr(websocket, "transport", None)
+    return transport.get_write_buffer_size() if transport is not None else 0
+
+
+class _Subscriber:
+    __slots__ = ("websocket", "queue", "task", "dropped")
+
+    def __init__(self, websocket: Any, queue_size: int) -> None:
+        self.websocket = websocket
+        self.queue: "asyncio.Queue[Union[str, bytes]]" = asyncio.Queue(maxsize=queue_size)
+        self.task: Optional["asyncio.Task[None]"] = None
+        self.dropped = 0
+
+    @property
+    def idle(self) -> bool:
+        return self.task is None and self.queue.empty()
+
+
+class Broadcaster:
+    def __init__(
+        self,
+        queue_size: int = 8,
+        policy: str = POLICY_DROP_OLDEST,
+        max_buffered: int = 256 * 1024,
+        send_timeout: float = 10.0,
+        max_drops: int = 32,
+        write: Optional[Callable[[Iterable[Any], Union[str, bytes]], None]] = None,
+    ) -> None:
+        if policy not in (POLICY_DROP_OLDEST, POLICY_DISCONNECT):
+            raise ValueError(f"未知的慢速连接策略: {policy}")
+        self.queue_size = queue_size
+        self.policy = policy
+        self.max_buffered = max_buffered
+        self.send_timeout = send_timeout
+        self.max_drops = max_drops
+        # 同步批量写入函数，默认即 websockets.broadcast
+        self._write = write or websockets.broadcast
+        self._subscribers: Dict[Any, _Subscriber] = {}
+        self.published = 0
+        self.direct = 0
+        self.queued = 0
+        self.dropped = 0
+        self.disconnected = 0
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def register(self, websocket: Any) -> None:
+        self._subscribers[websocket] = _Subscriber(websocket, self.queue_size)
+
+    def unregister(self, websocket: Any) -> None:
+        subscriber = self._subscribers.pop(websocket, None)
+        if subscriber is not None and subscriber.task is not None:
+            subscriber.task.cancel()
+
+    def publish(self, message: Union[Dict[str, Any], str, bytes]) -> int:
+        """序列化一次并发往所有连接，不等待发送完成，返回接收连接数。
+
+        须在事件循环线程中调用；其他线程请使用 ``loop.call_soon_threadsafe``。
+        """
+        payload = message if isinstance(message, (str, bytes)) else json.dumps(message)
+        self.published += 1
+        ready: List[Any] = []
+        count = 0
+        for subscriber in list(self._subscribers.values()):
+            if subscriber.idle and _buffered(subscriber.websocket) <= self.max_buffered:
+                ready.append(subscriber.websocket)
+            elif not self._enqueue(subscriber, payload):
+                continue
+            count += 1
+        if ready:
+            self._write(ready, payload)
+            self.direct += len(ready)
+        return count
+
+    def _enqueue(self, subscriber: _Subscriber, payload: Union[str, bytes]) -> bool:
+        if subscriber.queue.full():
+            if self.policy == POLICY_DISCONNECT or subscriber.dropped >= self.max_drops:
+                self._evict(subscriber, "发送队列溢出")
+                return False
+            subscriber.queue.get_nowait()
+            subscriber.dropped += 1
+            self.dropped += 1
+        subscriber.queue.put_nowait(payload)
+        self.queued += 1
+        if subscriber.task is None:
+            subscriber.task = asyncio.get_running_loop().create_task(self._writer(subscriber))
+        return True
+
+    def _evict(self, subscriber: _Subscriber, reason: str) -> None:
+        if self._subscribers.get(subscriber.websocket) is not subscriber:
+            return
+        self.disconnected += 1
+        logger.warning("断开慢速连接 (%s): %s", reason, getattr(subscriber.websocket, "remote_address", None))
+        self.unregister(subscriber.websocket)
+        asyncio.get_running_loop().create_task(self._close(subscriber.websocket))
+
+    async def _close(self, websocket: Any) -> None:
+        try:
+            await asyncio.wait_for(websocket.close(code=1008, reason="slow consumer"), self.send_timeout)
+        except Exception:  # noqa: BLE001
+            pass
+
+    async def _writer(self, subscriber: _Subscriber) -> None:
+        """排空积压队列；send 会等待发送缓冲区回落，队列空后协程退出。"""
+        try:
+            while not subscriber.queue.empty():
+                payload = subscriber.queue.get_nowait()
+                try:
+                    await asyncio.wait_for(subscriber.websocket.send(payload), self.send_timeout)
+                except asyncio.TimeoutError:
+                    self._evict(subscriber, "发送超时")
+                    return
+                except asyncio.CancelledError:
+                    raise
+                except Exception:  # noqa: BLE001
+                    # 连接已关闭等情况，由 handler 的 finally 负责注销
+                    self._subscribers.pop(subscriber.websocket, None)
+                    return
+        finally:
+            subscriber.task = None
+
+    def metrics(self) -> Dict[str, Any]:
+        depths = [subscriber.queue.qsize() for subscriber in self._subscribers.values()]
+        return {
+            "subscribers": len(depths),
+            "policy": self.policy,
+            "queue_size": self.queue_size,
+            "backlogged": sum(1 for depth in depths if depth),
+            "max_queue_depth": max(depths, default=0),
+            "published": self.published,
+            "direct": self.direct,
+            "queued": self.queued,
+            "dropped": self.dropped,
+            "disconnected": self.disconnected,
+        }
@@ -4,9 +4,148 @@ import os
 import hashlib
 import secrets
 import json
-from typing import Optional, Dict, Any, Tuple
+import asyncio
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Tuple, Callable, Iterator
+
+from session_tracker import SessionTracker
+from token_cache import TokenCache
+from work_queue import ServerBusyError, WorkQueue
 
 DB_NAME = 'crypto_lab.db'
+# 连接池大小，同时也是异步门面的工作线程数
+POOL_SIZE = 4
+
+# 密码哈希专用的有界线程池：PBKDF2 在 OpenSSL 中执行时释放 GIL，线程即可并行；
+# 排队数超过上限的注册/登录直接以 ServerBusyError 拒绝
+HASH_WORKERS = 2
+HASH_MAX_PENDING = 64
+password_queue = WorkQueue(max_workers=HASH_WORKERS, max_pending=HASH_MAX_PENDING, name='pbkdf2')
+
+# 令牌校验缓存：有效令牌缓存 60 秒，无效令牌负缓存 10 秒
+token_cache = TokenCache(max_size=10000, ttl=60.0, negative_ttl=10.0)
+
+# 会话记录写回：每 2 秒批量写入一次，保留最近 30 天有活动的会话
+SESSION_FLUSH_INTERVAL = 2.0
+SESSION_RETENTION_DAYS = 30
+session_tracker = SessionTracker(
+    lambda: get_pool().connection(),
+    flush_interval=SESSION_FLUSH_INTERVAL,
+    retention_days=SESSION_RETENTION_DAYS
+)
+
+
+class ConnectionPool:
+    """
+    SQLite 连接池
+    连接在调用之间复用并开启 WAL（读写互不阻塞），sqlite3 的语句缓存随连接
+    保留，相同的 SQL 只编译一次。归还时未提交的事务会被回滚，与原先
+    不提交直接关闭连接的语义一致。
+    """
+
+    def __init__(self, path: str, size: int = POOL_SIZE, statement_cache: int = 128):
+        self.path = path
+        self.size = size
+        self.statement_cache = statement_cache
+        self._idle: 'queue.LifoQueue[sqlite3.Connection]' = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self.borrowed = 0
+        self.waits = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=5.0,
+            check_same_thread=False,
+            cached_statements=self.statement_cache
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        # WAL 下 NORMAL 只在检查点时 fsync，断电最多丢失最近的事务，不会损坏数据库
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+            else:
+                self.waits += 1
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=30)
+        except queue.Empty:
+            raise sqlite3.OperationalError('等待数据库连接超时') from None
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """借出一个连接，用完自动归还"""
+        conn = self._acquire()
+        with self._lock:
+            self.borrowed += 1
+        try:
+            yield conn
+        finally:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except sqlite3.Error:
+                # 连接已不可用，丢弃并允许重新创建
+                conn.close()
+                with self._lock:
+                    self._created -= 1
+            else:
+                self._idle.put(conn)
+
+    def close(self) -> None:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'size': self.size,
+                'connections': self._created,
+                'idle': self._idle.qsize(),
+                'borrowed': self.borrowed,
+                'waits': self.waits
+            }
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """返回 DB_NAME 对应的进程内连接池，首次使用时创建"""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.path != DB_NAME:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(DB_NAME)
+        return _pool
+
 
 def hash_password(password: str, salt: Optional[str] = None) -> Tuple[str, str]:
     """
@@ -35,7 +174,11 @@ def generate_token() -> str:
 
 def init_db():
     """初始化数据库表结构"""
-    conn = sqlite3.connect(DB_NAME)
+    with get_pool().connection() as conn:
+        _create_tables(conn)
+    print(f"[Database] 数据库 {DB_NAME} 初始化完成（WAL 模式）")
+
+def _create_tables(conn: sqlite3.Connection) -> None:
     c = conn.cursor()
     
     # 创建用户表
@@ -68,32 +211,29 @@ def init_db():
                   ip_address TEXT,
                   FOREIGN KEY (user_id) REFERENCES users(id))''')
     
+    # token 列的 UNIQUE 约束已自带索引；按用户查询会话与按活动时间清理需要额外索引
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_user_sessions_user
+                 ON user_sessions (user_id, last_activity)''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_user_sessions_last_activity
+                 ON user_sessions (last_activity)''')
+    
     conn.commit()
-    conn.close()
-    print(f"[Database] 数据库 {DB_NAME} 初始化完成")
 
 # ============== 用户认证功能 ==============
 
-def register_user(username: str, password: str, email: Optional[str] = None) -> Dict[str, Any]:
-    """
-    注册新用户
-    返回 {'success': bool, 'message': str, 'user': user_info}
-    """
-    try:
-        conn = sqlite3.connect(DB_NAME)
+# 注册与登录分为查库、密码哈希、写库三步：同步接口依次执行，异步门面把哈希
+# 交给 password_queue，数据库线程不会被 PBKDF2 占满
+
+def _username_taken(username: str) -> bool:
+    with get_pool().connection() as conn:
         c = conn.cursor()
-        
-        # 检查用户是否已存在
         c.execute("SELECT id FROM users WHERE username = ?", (username,))
-        if c.fetchone():
-            return {
-                'success': False,
-                'message': f'用户名 {username} 已存在'
-            }
-        
-        # 生成密码哈希
-        password_hash, password_salt = hash_password(password)
-        token = generate_token()
+        return c.fetchone() is not None
+
+def _insert_user(username: str, email: Optional[str], password_hash: str, password_salt: str) -> Dict[str, Any]:
+    token = generate_token()
+    with get_pool().connection() as conn:
+        c = conn.cursor()
         
         # 插入新用户
         c.execute('''INSERT INTO users 
@@ -103,20 +243,39 @@ def register_user(username: str, password: str, email: Optional[str] = None) ->
         
         conn.commit()
         user_id = c.lastrowid
-        conn.close()
-        
-        print(f"[Database] 新用户注册成功: {username}")
-        
-        return {
-            'success': True,
-            'message': '注册成功',
-            'user': {
-                'id': user_id,
-                'username': username,
-                'email': email,
-                'created_at': datetime.datetime.now().isoformat()
-            }
+    
+    print(f"[Database] 新用户注册成功: {username}")
+    
+    return {
+        'success': True,
+        'message': '注册成功',
+        'user': {
+            'id': user_id,
+            'username': username,
+            'email': email,
+            'created_at': datetime.datetime.now().isoformat()
         }
+    }
+
+def _username_exists_result(username: str) -> Dict[str, Any]:
+    return {
+        'success': False,
+        'message': f'用户名 {username} 已存在'
+    }
+
+def register_user(username: str, password: str, email: Optional[str] = None) -> Dict[str, Any]:
+    """
+    注册新用户
+    返回 {'success': bool, 'message': str, 'user': user_info}
+    """
+    try:
+        # 检查用户是否已存在
+        if _username_taken(username):
+            return _username_exists_result(username)
+        
+        # 生成密码哈希
+        password_hash, password_salt = hash_password(password)
+        return _insert_user(username, email, password_hash, password_salt)
     except Exception as e:
         print(f"[Database] 注册失败: {e}")
         return {
@@ -124,68 +283,77 @@ def register_user(username: str, password: str, email: Optional[str] = None) ->
             'message': f'注册失败: {str(e)}'
         }
 
-def login_user(username: str, password: str, ip_address: Optional[str] = None) -> Dict[str, Any]:
+_LOGIN_FAILED = {
+    'success': False,
+    'message': '用户名或密码错误'
+}
+
+def _fetch_login_user(username: str) -> Tuple[Optional[tuple], Optional[Dict[str, Any]]]:
     """
-    用户登录
-    返回 {'success': bool, 'message': str, 'token': str, 'user': user_info}
+    查询登录用户
+    返回 (用户行, None)，用户不存在或已禁用时返回 (None, 失败结果)
     """
-    try:
-        conn = sqlite3.connect(DB_NAME)
+    with get_pool().connection() as conn:
         c = conn.cursor()
-        
-        # 查询用户
         c.execute('''SELECT id, password_hash, password_salt, username, email, is_active 
                      FROM users WHERE username = ?''', (username,))
         user = c.fetchone()
-        
-        if not user:
-            return {
-                'success': False,
-                'message': '用户名或密码错误'
-            }
-        
-        user_id, password_hash, password_salt, db_username, email, is_active = user
-        
-        if not is_active:
-            return {
-                'success': False,
-                'message': '账号已被禁用'
-            }
-        
-        # 验证密码
-        if not verify_password(password, password_hash, password_salt):
-            return {
-                'success': False,
-                'message': '用户名或密码错误'
-            }
-        
-        # 生成新令牌
-        token = generate_token()
+    
+    if not user:
+        return None, dict(_LOGIN_FAILED)
+    
+    if not user[5]:
+        return None, {
+            'success': False,
+            'message': '账号已被禁用'
+        }
+    return user, None
+
+def _start_session(user: tuple, ip_address: Optional[str]) -> Dict[str, Any]:
+    """密码校验通过后生成新令牌；会话记录交给 session_tracker 批量写入"""
+    user_id, _, _, db_username, email, _ = user
+    
+    # 生成新令牌
+    token = generate_token()
+    
+    with get_pool().connection() as conn:
+        c = conn.cursor()
         
         # 更新用户令牌
         c.execute("UPDATE users SET token = ? WHERE id = ?", (token, user_id))
-        
-        # 记录会话
-        c.execute('''INSERT INTO user_sessions 
-                     (user_id, token, ip_address)
-                     VALUES (?, ?, ?)''',
-                  (user_id, token, ip_address))
-        
         conn.commit()
-        conn.close()
+    # 旧令牌已被覆盖，立即作废其缓存
+    token_cache.invalidate_user(user_id)
+    session_tracker.record_login(user_id, token, ip_address)
+    
+    print(f"[Database] 用户登录成功: {db_username}")
+    
+    return {
+        'success': True,
+        'message': '登录成功',
+        'token': token,
+        'user': {
+            'id': user_id,
+            'username': db_username,
+            'email': email
+        }
+    }
+
+def login_user(username: str, password: str, ip_address: Optional[str] = None) -> Dict[str, Any]:
+    """
+    用户登录
+    返回 {'success': bool, 'message': str, 'token': str, 'user': user_info}
+    """
+    try:
+        user, failure = _fetch_login_user(username)
+        if failure:
+            return failure
         
-        print(f"[Database] 用户登录成功: {username}")
+        # 验证密码
+        if not verify_password(password, user[1], user[2]):
+            return dict(_LOGIN_FAILED)
         
-        return {
-            'success': True,
-            'message': '登录成功',
-            'token': token,
-            'user': {
-                'id': user_id,
-                'username': db_username,
-                'email': email
-            }
-        }
+        return _start_session(user, ip_address)
     except Exception as e:
         print(f"[Database] 登录失败: {e}")
         return {
@@ -196,25 +364,38 @@ def login_user(username: str, password: str, ip_address: Optional[str] = None) -
 def verify_token(token: str) -> Optional[Dict[str, Any]]:
     """
     验证令牌并返回用户信息
-    返回 user_info 或 None
+    返回 user_info 或 None，结果经 token_cache 缓存
     """
+    hit, cached = token_cache.get(token)
+    if hit:
+        if cached:
+            session_tracker.touch(token)
+        return cached
+    return _verify_token_uncached(token, token_cache.version)
+
+def _verify_token_uncached(token: str, version: int) -> Optional[Dict[str, Any]]:
+    """查库校验令牌；version 须在查询前取得，期间发生过失效则结果不入缓存，
+    校验通过时记录会话活动"""
     try:
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        
-        c.execute('''SELECT u.id, u.username, u.email, u.is_active
-                     FROM users u
-                     WHERE u.token = ? AND u.is_active = 1''', (token,))
-        user = c.fetchone()
-        conn.close()
+        with get_pool().connection() as conn:
+            c = conn.cursor()
+            
+            c.execute('''SELECT u.id, u.username, u.email, u.is_active
+                         FROM users u
+                         WHERE u.token = ? AND u.is_active = 1''', (token,))
+            user = c.fetchone()
         
         if user:
             user_id, username, email, is_active = user
-            return {
+            user_info = {
                 'id': user_id,
                 'username': username,
                 'email': email
             }
+            token_cache.put(token, user_info, version)
+            session_tracker.touch(token)
+            return user_info
+        token_cache.put(token, None, version)
         return None
     except Exception as e:
         print(f"[Database] 令牌验证失败: {e}")
@@ -223,11 +404,11 @@ def verify_token(token: str) -> Optional[Dict[str, Any]]:
 def logout_user(token: str) -> bool:
     """用户登出，清除令牌"""
     try:
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute("UPDATE users SET token = NULL WHERE token = ?", (token,))
-        conn.commit()
-        conn.close()
+        with get_pool().connection() as conn:
+            c = conn.cursor()
+            c.execute("UPDATE users SET token = NULL WHERE token = ?", (token,))
+            conn.commit()
+        token_cache.invalidate(token)
         print(f"[Database] 用户登出成功")
         return True
     except Exception as e:
@@ -237,12 +418,11 @@ def logout_user(token: str) -> bool:
 def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
     """根据 ID 获取用户信息"""
     try:
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('''SELECT id, username, email, created_at, is_active
-                     FROM users WHERE id = ?''', (user_id,))
-        user = c.fetchone()
-        conn.close()
+        with get_pool().connection() as conn:
+            c = conn.cursor()
+            c.execute('''SELECT id, username, email, created_at, is_active
+                         FROM users WHERE id = ?''', (user_id,))
+            user = c.fetchone()
         
         if user:
             user_id, username, email, created_at, is_active = user
@@ -263,12 +443,96 @@ def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
 def save_message(sender, content_encrypted, iv):
     """保存一条加密消息"""
     try:
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute("INSERT INTO messages (sender, content_encrypted, iv, timestamp) VALUES (?, ?, ?, ?)",
-                  (sender, content_encrypted, iv, datetime.datetime.now()))
-        conn.commit()
-        conn.close()
+        with get_pool().connection() as conn:
+            c = conn.cursor()
+            c.execute("INSERT INTO messages (sender, content_encrypted, iv, timestamp) VALUES (?, ?, ?, ?)",
+                      (sender, content_encrypted, iv, datetime.datetime.now()))
+            conn.commit()
         print(f"[Database] 已存储来自 {sender} 的消息")
     except Exception as e:
         print(f"[Database] 存储失败: {e}")
+
+# ============== 异步门面 ==============
+
+class AsyncDatabase:
+    """
+    数据库操作的异步门面
+    调用在专用线程池中执行，线程数与连接池大小一致，事件循环不会阻塞在
+    磁盘 IO 上；密码哈希在 password_queue 中执行，队列已满时抛出
+    ServerBusyError，其余返回值与同名同步函数相同
+    """
+
+    def __init__(self, workers: int = POOL_SIZE):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='db-worker')
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def register_user(self, username: str, password: str, email: Optional[str] = None) -> Dict[str, Any]:
+        try:
+            if await self.run(_username_taken, username):
+                return _username_exists_result(username)
+            password_hash, password_salt = await password_queue.run(hash_password, password)
+            return await self.run(_insert_user, username, email, password_hash, password_salt)
+        except ServerBusyError:
+            raise
+        except Exception as e:
+            print(f"[Database] 注册失败: {e}")
+            return {
+                'success': False,
+                'message': f'注册失败: {str(e)}'
+            }
+
+    async def login_user(self, username: str, password: str, ip_address: Optional[str] = None) -> Dict[str, Any]:
+        try:
+            user, failure = await self.run(_fetch_login_user, username)
+            if failure:
+                return failure
+            if not await password_queue.run(verify_password, password, user[1], user[2]):
+                return dict(_LOGIN_FAILED)
+            return await self.run(_start_session, user, ip_address)
+        except ServerBusyError:
+            raise
+        except Exception as e:
+            print(f"[Database] 登录失败: {e}")
+            return {
+                'success': False,
+                'message': f'登录失败: {str(e)}'
+            }
+
+    async def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
+        # 缓存命中时直接在事件循环中返回，不占用数据库线程
+        hit, cached = token_cache.get(token)
+        if hit:
+            if cached:
+                session_tracker.touch(token)
+            return cached
+        return await self.run(_verify_token_uncached, token, token_cache.version)
+
+    async def logout_user(self, token: str) -> bool:
+        return await self.run(logout_user, token)
+
+    async def get_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
+        return await self.run(get_user_by_id, user_id)
+
+    async def save_message(self, sender, content_encrypted, iv) -> None:
+        await self.run(save_message, sender, content_encrypted, iv)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'pool': get_pool().stats(),
+            'token_cache': token_cache.metrics(),
+            'password_hashing': password_queue.metrics(),
+            'sessions': session_tracker.metrics()
+        }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        password_queue.shutdown()
+        # 先写入积压的会话记录再关闭连接池
+        session_tracker.close()
+        get_pool().close()
+
+
+db = AsyncDatabase()
@@ -0,0 +1,82 @@
+"""FHE 密钥的本地持久化存储。
+
+每个密钥纪元的各引擎私钥参数以紧凑二进制（见 ``wire_format.pack_ints``）
+保存在独立的 SQLite 文件中，文件权限限制为仅属主可读写。服务重启时若最新
+纪元仍在轮换窗口内，可直接加载而无需重新生成密钥。
+"""
+
+import os
+import sqlite3
+from typing import Dict, List, Mapping, Tuple
+
+DEFAULT_PATH = "fhe_keys.db"
+
+
+class KeyStore:
+    def __init__(self, path: str = DEFAULT_PATH, keep_epochs: int = 4) -> None:
+        self.path = path
+        self.keep_epochs = keep_epochs
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path)
+
+    def _init_db(self) -> None:
+        # 先以 0600 创建文件，避免 SQLite 按 umask 创建出可被他人读取的私钥文件
+        fd = os.open(self.path, os.O_CREAT | os.O_RDWR, 0o600)
+        os.close(fd)
+        try:
+            os.chmod(self.path, 0o600)
+        except OSError:
+            pass
+        conn = self._connect()
+        try:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS fhe_key_epochs
+                   (epoch INTEGER NOT NULL,
+                    algorithm TEXT NOT NULL,
+                    activated_at REAL NOT NULL,
+                    key_blob BLOB NOT NULL,
+                    PRIMARY KEY (epoch, algorithm))"""
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def save(self, epoch: int, activated_at: float, blobs: Mapping[str, bytes]) -> None:
+        """写入一个纪元的全部引擎私钥，并只保留最近 keep_epochs 个纪元。"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO fhe_key_epochs VALUES (?, ?, ?, ?)",
+                    [(epoch, name, activated_at, blob) for name, blob in blobs.items()],
+                )
+                conn.execute(
+                    """DELETE FROM fhe_key_epochs WHERE epoch NOT IN
+                       (SELECT DISTINCT epoch FROM fhe_key_epochs ORDER BY epoch DESC LIMIT ?)""",
+                    (self.keep_epochs,),
+                )
+        finally:
+            conn.close()
+
+    def load_recent(self, limit: int) -> List[Tuple[int, float, Dict[str, bytes]]]:
+        """按纪元从新到旧返回 [(纪元, 激活时间戳, {算法: 私钥数据})]。"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                """SELECT epoch, algorithm, activated_at, key_blob FROM fhe_key_epochs
+                   WHERE epoch IN
+                   (SELECT DISTINCT epoch FROM fhe_key_epochs ORDER BY epoch DESC LIMIT ?)
+                   ORDER BY epoch DESC""",
+                (limit,),
+            ).fetchall()
+        finally:
+            conn.close()
+
+        records: List[Tuple[int, float, Dict[str, bytes]]] = []
+        for epoch, algorithm, activated_at, blob in rows:
+            if not records or records[-1][0] != epoch:
+                records.append((epoch, activated_at, {}))
+            records[-1][2][algorithm] = bytes(blob)
+        return records
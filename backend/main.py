@@ -1,19 +1,23 @@
 import asyncio
 import json
 import logging
+import os
 import secrets
 import sys
 from datetime import datetime
-from typing import Any, Dict, Set
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
 import websockets
 from websockets.server import WebSocketServerProtocol
 
-from fhe_service import FHEManager
-from database import (
-    init_db, register_user, login_user, verify_token, 
-    logout_user, get_user_by_id
-)
+import bigint
+import wire_format
+from broadcaster import Broadcaster
+from fhe_service import AggregateJob, FHEManager, KeySnapshot
+from key_store import KeyStore
+from wire_format import FORMAT_BINARY, FORMAT_JSON
+from work_queue import ServerBusyError, WorkQueue
+from database import db, init_db
 
 # HTTP 服务器支持 (用于 REST API)
 try:
@@ -37,12 +41,37 @@ logger = logging.getLogger(__name__)
 # 初始化数据库
 init_db()
 
-fhe_manager = FHEManager(rotation_interval=5 * 60)
+# 密钥持久化到独立的 SQLite 文件，重启时在轮换窗口内直接加载；设为空字符串可关闭
+KEY_STORE_PATH = os.environ.get("FHE_KEY_STORE", "fhe_keys.db")
+fhe_manager = FHEManager(
+    rotation_interval=5 * 60,
+    key_store=KeyStore(KEY_STORE_PATH) if KEY_STORE_PATH else None,
+)
+# 同态加密/计算经线程池调度，排队超过上限时直接回复 SERVER_BUSY；
+# 线程不释放 GIL，大批量加密由 fhe_manager 在多核时再交给工作进程
+fhe_queue = WorkQueue(max_workers=2, max_pending=32)
+# 管理接口（强制轮换密钥，供压测使用）的令牌；未设置时接口关闭
+ADMIN_TOKEN = os.environ.get("FHE_ADMIN_TOKEN", "")
 
 
 connected_clients: Set[WebSocketServerProtocol] = set()
+# 广播使用每连接有界队列，慢速连接被丢弃旧消息或断开，不影响其他客户端
+broadcaster = Broadcaster(queue_size=8)
 mpc_sessions: Dict[WebSocketServerProtocol, Dict[str, Any]] = {}
 
+# 流式批量加密/同态计算：每个连接最多同时进行的任务数与默认分块大小
+MAX_STREAM_JOBS = 8
+STREAM_CHUNK_SIZE = 256
+ACCUMULATOR_MESSAGE_TYPES = {"ACC_OPEN", "ACC_ADD", "ACC_READ", "ACC_DECRYPT", "ACC_CLOSE"}
+STREAM_MESSAGE_TYPES = {
+    "BATCH_ENCRYPT_BEGIN",
+    "BATCH_ENCRYPT_CHUNK",
+    "BATCH_ENCRYPT_END",
+    "COMPUTE_FHE_BEGIN",
+    "COMPUTE_FHE_CHUNK",
+    "COMPUTE_FHE_END",
+}
+
 
 def build_server_time() -> Dict[str, Any]:
     """返回统一的服务器时间戳信息。"""
@@ -54,21 +83,324 @@ def build_server_time() -> Dict[str, Any]:
     }
 
 
-async def broadcast(message: Dict[str, Any]) -> None:
-    """向所有已连接客户端广播消息。"""
-    if not connected_clients:
-        return
+def collect_metrics() -> Dict[str, Any]:
+    """汇总工作队列与 FHE 引擎的运行指标。"""
+    return {
+        "connections": len(connected_clients),
+        "broadcast": broadcaster.metrics(),
+        "work_queue": fhe_queue.metrics(),
+        "fhe": fhe_manager.get_stats(),
+        "database": db.metrics(),
+    }
+
 
-    payload = json.dumps(message)
-    tasks = []
-    for client in list(connected_clients):
-        if client.closed:
-            connected_clients.discard(client)
-            continue
-        tasks.append(client.send(payload))
+def busy_payload(msg_type: str, exc: ServerBusyError) -> Dict[str, Any]:
+    return {
+        "type": "SERVER_BUSY",
+        "request": msg_type,
+        "error": str(exc),
+        "retry_after": exc.retry_after,
+    }
+
+
+def build_encrypted_batch(
+    header: Dict[str, Any],
+    algorithm: str,
+    values: list,
+    wire: str,
+    snapshot: Optional[KeySnapshot] = None,
+    packing: Optional[Dict[str, Any]] = None,
+) -> Tuple[Union[str, bytes], int]:
+    """在工作线程中加密并按连接协商的线格式序列化，返回 (帧, 条数)。
+
+    结果带上密钥纪元，客户端提交计算时回传该纪元即可在宽限期内使用旧密钥。
+    带 packing 时多个数值打包进同一密文，每条结果的 originals 为其包含的明文。
+    """
+    snapshot = snapshot or fhe_manager.current_snapshot()
+    header = {**header, "epoch": snapshot.epoch}
+    if packing:
+        engine, layout, pairs = fhe_manager.encrypt_packed_raw(
+            algorithm, values, packing, snapshot
+        )
+        header["packing"] = layout._asdict()
+        if wire == FORMAT_BINARY:
+            return wire_format.encode_encrypted_batch(header, engine, pairs), len(pairs)
+        items = [
+            {"originals": originals, "ciphertext": engine.encode_ciphertext(ciphertext)}
+            for originals, ciphertext in pairs
+        ]
+        return json.dumps({**header, "items": items}), len(items)
+    engine, pairs = fhe_manager.encrypt_batch_raw(algorithm, values, snapshot)
+    if wire == FORMAT_BINARY:
+        return wire_format.encode_encrypted_batch(header, engine, pairs), len(pairs)
+    items = [
+        {"original": original, "ciphertext": engine.encode_ciphertext(ciphertext)}
+        for original, ciphertext in pairs
+    ]
+    return json.dumps({**header, "items": items}), len(items)
+
+
+def add_ciphertexts(job: AggregateJob, data: Dict[str, Any], blobs: List[bytes]) -> int:
+    """二进制帧的密文位于第一个数据块，否则取 JSON 中的 ciphertexts。"""
+    if blobs:
+        return job.add_raw(job.engine.unpack_ciphertexts(blobs[0]))
+    return job.add(data.get("ciphertexts") or [])
+
+
+def build_compute_result(
+    header: Dict[str, Any], job: AggregateJob, wire: str
+) -> Union[str, bytes]:
+    result = job.finish_raw()
+    if wire == FORMAT_BINARY:
+        return wire_format.encode_compute_result(header, job.engine, result)
+    result["ciphertext"] = job.engine.encode_ciphertext(result["ciphertext"])
+    return json.dumps({**header, **result})
+
+
+def run_compute(
+    header: Dict[str, Any],
+    algorithm: str,
+    data: Dict[str, Any],
+    blobs: List[bytes],
+    wire: str,
+) -> Union[str, bytes]:
+    job = fhe_manager.open_aggregate(
+        algorithm, fhe_manager.snapshot_for(data.get("epoch")), data.get("packing")
+    )
+    add_ciphertexts(job, data, blobs)
+    return build_compute_result(header, job, wire)
+
+
+def json_with_raw(fields: Dict[str, Any], **raw: str) -> str:
+    """序列化 fields，并把已序列化好的 JSON 片段原样拼接为额外字段。"""
+    head = json.dumps(fields)
+    extra = ", ".join(f'"{key}": {value}' for key, value in raw.items())
+    return f"{head[:-1]}, {extra}}}" if extra else head
+
+
+def build_key_bundle(algorithm: str, wire: str) -> Union[str, bytes]:
+    bundle = fhe_manager.key_bundle(algorithm)
+    if wire == FORMAT_BINARY:
+        return bundle.binary_frame({"type": "FHE_KEY"})
+    # 公钥部分来自纪元缓存，仅拼接类型字段
+    return '{"type": "FHE_KEY", ' + bundle.bundle_json()[1:]
+
+
+def build_keys_message(msg_type: str, with_time: bool = False) -> str:
+    fields: Dict[str, Any] = {"type": msg_type}
+    if with_time:
+        fields.update(build_server_time())
+    return json_with_raw(fields, keys=fhe_manager.all_key_bundles_json())
+
+
+def _chunk_size(data: Dict[str, Any]) -> int:
+    try:
+        size = int(data.get("chunk_size") or STREAM_CHUNK_SIZE)
+    except (TypeError, ValueError):
+        size = STREAM_CHUNK_SIZE
+    return max(1, min(size, 4 * STREAM_CHUNK_SIZE))
+
+
+async def stream_encrypt(
+    websocket: WebSocketServerProtocol,
+    job_id: str,
+    job: Dict[str, Any],
+    values: list,
+    wire: str,
+) -> None:
+    """按块加密并立即回传，避免在内存中拼出完整结果。"""
+    size = job["chunk_size"]
+    for start in range(0, len(values), size):
+        header = {
+            "type": "ENCRYPTED_BATCH_CHUNK",
+            "job_id": job_id,
+            "algorithm": job["algorithm"],
+            "seq": job["seq"],
+            "offset": job["count"],
+        }
+        frame, count = await fhe_queue.run(
+            build_encrypted_batch,
+            header,
+            job["algorithm"],
+            values[start : start + size],
+            wire,
+            job["snapshot"],
+            job["packing"],
+        )
+        await websocket.send(frame)
+        job["seq"] += 1
+        job["count"] += count
+
+
+async def handle_stream_message(
+    websocket: WebSocketServerProtocol,
+    msg_type: str,
+    data: Dict[str, Any],
+    jobs: Dict[str, Dict[str, Any]],
+    blobs: List[bytes],
+    wire: str,
+) -> None:
+    """处理 BEGIN/CHUNK/END 流式协议消息，jobs 为当前连接的任务表。"""
+    job_id = str(data.get("job_id") or "")
+    if msg_type == "BATCH_ENCRYPT":
+        job_id = job_id or secrets.token_hex(8)
+    if not job_id:
+        raise ValueError("流式任务缺少 job_id")
+
+    if msg_type in ("BATCH_ENCRYPT", "BATCH_ENCRYPT_BEGIN", "COMPUTE_FHE_BEGIN"):
+        if job_id in jobs:
+            raise ValueError(f"任务 {job_id} 已存在")
+        if len(jobs) >= MAX_STREAM_JOBS:
+            raise ValueError("同时进行的流式任务过多")
+        algorithm = str(data.get("algorithm", "PAILLIER")).upper()
+        if msg_type == "COMPUTE_FHE_BEGIN":
+            # 计算按密文所属纪元路由，加密总是使用当前纪元
+            snapshot = fhe_manager.snapshot_for(data.get("epoch"))
+        else:
+            snapshot = fhe_manager.current_snapshot()
+        if algorithm not in snapshot.engines:
+            raise ValueError(f"不支持的同态算法: {algorithm}")
+        if msg_type == "COMPUTE_FHE_BEGIN":
+            jobs[job_id] = {
+                "kind": "compute",
+                "algorithm": algorithm,
+                "aggregate": fhe_manager.open_aggregate(
+                    algorithm, snapshot, data.get("packing")
+                ),
+            }
+            await websocket.send(
+                json.dumps(
+                    {
+                        "type": "COMPUTE_FHE_READY",
+                        "job_id": job_id,
+                        "algorithm": algorithm,
+                        "epoch": snapshot.epoch,
+                    }
+                )
+            )
+            return
+
+        job = {
+            "kind": "encrypt",
+            "algorithm": algorithm,
+            "snapshot": snapshot,
+            "packing": data.get("packing"),
+            "chunk_size": _chunk_size(data),
+            "seq": 0,
+            "count": 0,
+        }
+        jobs[job_id] = job
+        await websocket.send(
+            json.dumps(
+                {
+                    "type": "ENCRYPTED_BATCH_BEGIN",
+                    "job_id": job_id,
+                    "algorithm": algorithm,
+                    "epoch": snapshot.epoch,
+                }
+            )
+        )
+        if msg_type == "BATCH_ENCRYPT_BEGIN":
+            return
+        # 单条 BATCH_ENCRYPT(stream=true)：直接分块回传并结束
+        msg_type = "BATCH_ENCRYPT_END"
+        try:
+            await stream_encrypt(websocket, job_id, job, list(data.get("values") or []), wire)
+        except Exception:
+            jobs.pop(job_id, None)
+            raise
+
+    job = jobs.get(job_id)
+    if job is None:
+        raise ValueError(f"未知的流式任务: {job_id}")
+
+    if msg_type == "BATCH_ENCRYPT_CHUNK" and job["kind"] == "encrypt":
+        await stream_encrypt(websocket, job_id, job, list(data.get("values") or []), wire)
+    elif msg_type == "BATCH_ENCRYPT_END" and job["kind"] == "encrypt":
+        jobs.pop(job_id, None)
+        await websocket.send(
+            json.dumps(
+                {
+                    "type": "ENCRYPTED_BATCH_END",
+                    "job_id": job_id,
+                    "algorithm": job["algorithm"],
+                    "chunks": job["seq"],
+                    "count": job["count"],
+                }
+            )
+        )
+        logger.info("完成 %s 流式批量加密 (%d)", job["algorithm"], job["count"])
+    elif msg_type == "COMPUTE_FHE_CHUNK" and job["kind"] == "compute":
+        received = await fhe_queue.run(add_ciphertexts, job["aggregate"], data, blobs)
+        await websocket.send(
+            json.dumps({"type": "COMPUTE_FHE_ACK", "job_id": job_id, "received": received})
+        )
+    elif msg_type == "COMPUTE_FHE_END" and job["kind"] == "compute":
+        jobs.pop(job_id, None)
+        header = {"type": "COMPUTE_RESULT", "job_id": job_id, "algorithm": job["algorithm"]}
+        frame = await fhe_queue.run(build_compute_result, header, job["aggregate"], wire)
+        await websocket.send(frame)
+        logger.info("完成 %s 流式同态计算 (%d)", job["algorithm"], job["aggregate"].count)
+    else:
+        raise ValueError(f"消息 {msg_type} 与任务 {job_id} 的类型不匹配")
+
+
+def accumulator_add(accumulator_id: str, data: Dict[str, Any], blobs: List[bytes]) -> Dict[str, Any]:
+    if blobs:
+        engine = fhe_manager.accumulator_engine(accumulator_id)
+        return fhe_manager.accumulate(accumulator_id, raw=engine.unpack_ciphertexts(blobs[0]))
+    return fhe_manager.accumulate(accumulator_id, data.get("ciphertexts") or [])
+
+
+def accumulator_result(
+    header: Dict[str, Any], accumulator_id: str, decrypt: bool, wire: str
+) -> Union[str, bytes]:
+    engine = fhe_manager.accumulator_engine(accumulator_id)
+    if decrypt:
+        result = fhe_manager.decrypt_accumulator(accumulator_id)
+    else:
+        result = fhe_manager.read_accumulator(accumulator_id)
+    if wire == FORMAT_BINARY:
+        return wire_format.encode_compute_result(header, engine, result)
+    result["ciphertext"] = engine.encode_ciphertext(result["ciphertext"])
+    return json.dumps({**header, **result})
+
+
+async def handle_accumulator_message(
+    websocket: WebSocketServerProtocol,
+    msg_type: str,
+    data: Dict[str, Any],
+    blobs: List[bytes],
+    wire: str,
+) -> None:
+    """服务端增量累加器：客户端只需上传新增密文，无需重发历史数据。"""
+    if msg_type == "ACC_OPEN":
+        info = fhe_manager.open_accumulator(
+            data.get("algorithm", "PAILLIER"),
+            data.get("name") or None,
+            data.get("epoch"),
+            data.get("packing"),
+        )
+        await websocket.send(json.dumps({"type": "ACC_OPENED", **info}))
+        return
 
-    if tasks:
-        await asyncio.gather(*tasks, return_exceptions=True)
+    accumulator_id = str(data.get("accumulator_id") or "")
+    if not accumulator_id:
+        raise ValueError("缺少 accumulator_id")
+
+    if msg_type == "ACC_ADD":
+        info = await fhe_queue.run(accumulator_add, accumulator_id, data, blobs)
+        await websocket.send(json.dumps({"type": "ACC_UPDATED", **info}))
+    elif msg_type in ("ACC_READ", "ACC_DECRYPT"):
+        decrypt = msg_type == "ACC_DECRYPT"
+        header = {"type": "ACC_RESULT" if decrypt else "ACC_VALUE"}
+        frame = await fhe_queue.run(accumulator_result, header, accumulator_id, decrypt, wire)
+        await websocket.send(frame)
+    else:
+        closed = fhe_manager.close_accumulator(accumulator_id)
+        await websocket.send(
+            json.dumps({"type": "ACC_CLOSED", "accumulator_id": accumulator_id, "closed": closed})
+        )
 
 
 async def handler(websocket: WebSocketServerProtocol) -> None:
@@ -76,56 +408,105 @@ async def handler(websocket: WebSocketServerProtocol) -> None:
     logger.info("新连接: %s", client_addr)
 
     connected_clients.add(websocket)
+    broadcaster.register(websocket)
+    stream_jobs: Dict[str, Dict[str, Any]] = {}
+    wire = FORMAT_JSON
 
     try:
         async for message in websocket:
             try:
-                data = json.loads(message)
+                blobs: List[bytes] = []
+                if isinstance(message, bytes):
+                    data, blobs = wire_format.decode_frame(message)
+                else:
+                    data = json.loads(message)
                 msg_type = data.get("type")
 
-                if msg_type == "GET_FHE_KEY":
+                if msg_type == "SET_WIRE_FORMAT":
+                    requested = str(data.get("format", FORMAT_JSON)).lower()
+                    if requested in wire_format.SUPPORTED_FORMATS:
+                        wire = requested
+                    await websocket.send(
+                        json.dumps(
+                            {
+                                "type": "WIRE_FORMAT",
+                                "format": wire,
+                                "version": wire_format.VERSION,
+                                "supported": list(wire_format.SUPPORTED_FORMATS),
+                            }
+                        )
+                    )
+
+                elif msg_type == "GET_FHE_KEY":
                     algorithm = data.get("algorithm", "PAILLIER")
                     try:
-                        bundle = fhe_manager.get_key_bundle(algorithm)
-                        await websocket.send(
-                            json.dumps(
-                                {
-                                    "type": "FHE_KEY",
-                                    **bundle,
-                                }
-                            )
-                        )
-                        logger.info("已发送 %s 公钥", bundle["algorithm"])
+                        await websocket.send(build_key_bundle(algorithm, wire))
+                        logger.info("已发送 %s 公钥", algorithm.upper())
                     except ValueError as exc:
                         await websocket.send(
                             json.dumps({"type": "FHE_ERROR", "error": str(exc)})
                         )
 
                 elif msg_type == "GET_ALL_FHE_KEYS":
-                    await websocket.send(
-                        json.dumps(
-                            {
-                                "type": "FHE_KEYS",
-                                "keys": fhe_manager.get_all_key_bundles(),
-                            }
+                    await websocket.send(build_keys_message("FHE_KEYS"))
+
+                elif msg_type in STREAM_MESSAGE_TYPES or (
+                    msg_type == "BATCH_ENCRYPT" and data.get("stream")
+                ):
+                    try:
+                        await handle_stream_message(
+                            websocket, msg_type, data, stream_jobs, blobs, wire
+                        )
+                    except ServerBusyError as exc:
+                        await websocket.send(
+                            json.dumps({**busy_payload(msg_type, exc), "job_id": data.get("job_id")})
+                        )
+                    except Exception as exc:  # noqa: BLE001
+                        stream_jobs.pop(str(data.get("job_id") or ""), None)
+                        await websocket.send(
+                            json.dumps(
+                                {
+                                    "type": "FHE_ERROR",
+                                    "job_id": data.get("job_id"),
+                                    "error": str(exc),
+                                }
+                            )
                         )
-                    )
 
-                elif msg_type == "BATCH_ENCRYPT":
-                    algorithm = data.get("algorithm", "PAILLIER")
-                    values = data.get("values") or []
+                elif msg_type in ACCUMULATOR_MESSAGE_TYPES:
                     try:
-                        items = fhe_manager.encrypt_batch(algorithm, values)
+                        await handle_accumulator_message(websocket, msg_type, data, blobs, wire)
+                    except ServerBusyError as exc:
+                        await websocket.send(json.dumps(busy_payload(msg_type, exc)))
+                    except Exception as exc:  # noqa: BLE001
                         await websocket.send(
                             json.dumps(
                                 {
-                                    "type": "ENCRYPTED_BATCH",
-                                    "algorithm": algorithm,
-                                    "items": items,
+                                    "type": "FHE_ERROR",
+                                    "accumulator_id": data.get("accumulator_id"),
+                                    "error": str(exc),
                                 }
                             )
                         )
-                        logger.info("完成 %s 批量加密 (%d)", algorithm, len(items))
+
+                elif msg_type == "BATCH_ENCRYPT":
+                    algorithm = data.get("algorithm", "PAILLIER")
+                    values = data.get("values") or []
+                    try:
+                        header = {"type": "ENCRYPTED_BATCH", "algorithm": algorithm}
+                        frame, count = await fhe_queue.run(
+                            build_encrypted_batch,
+                            header,
+                            algorithm,
+                            values,
+                            wire,
+                            None,
+                            data.get("packing"),
+                        )
+                        await websocket.send(frame)
+                        logger.info("完成 %s 批量加密 (%d)", algorithm, count)
+                    except ServerBusyError as exc:
+                        await websocket.send(json.dumps(busy_payload(msg_type, exc)))
                     except Exception as exc:  # noqa: BLE001
                         await websocket.send(
                             json.dumps({"type": "FHE_ERROR", "error": str(exc)})
@@ -133,50 +514,42 @@ async def handler(websocket: WebSocketServerProtocol) -> None:
 
                 elif msg_type == "COMPUTE_FHE":
                     algorithm = data.get("algorithm", "PAILLIER")
-                    ciphertexts = data.get("ciphertexts") or []
                     try:
-                        result = fhe_manager.compute(algorithm, ciphertexts)
-                        await websocket.send(
-                            json.dumps(
-                                {
-                                    "type": "COMPUTE_RESULT",
-                                    "algorithm": algorithm,
-                                    **result,
-                                }
-                            )
+                        header = {"type": "COMPUTE_RESULT", "algorithm": algorithm}
+                        frame = await fhe_queue.run(
+                            run_compute, header, algorithm, data, blobs, wire
                         )
+                        await websocket.send(frame)
                         logger.info("完成 %s 同态计算", algorithm)
+                    except ServerBusyError as exc:
+                        await websocket.send(json.dumps(busy_payload(msg_type, exc)))
                     except Exception as exc:  # noqa: BLE001
                         await websocket.send(
                             json.dumps({"type": "FHE_ERROR", "error": str(exc)})
                         )
 
                 elif msg_type == "GET_SERVER_TIME":
-                    payload = {
-                        "type": "SERVER_TIME",
-                        **build_server_time(),
-                        "keys": fhe_manager.get_all_key_bundles(),
-                    }
-                    await websocket.send(json.dumps(payload))
+                    await websocket.send(build_keys_message("SERVER_TIME", with_time=True))
 
                 elif msg_type == "GET_KEY_STATUS":
                     algorithm = data.get("algorithm")
                     if algorithm:
                         try:
-                            info = fhe_manager.get_key_bundle(algorithm)
-                            payload = {
-                                "type": "KEY_STATUS",
-                                "algorithm": algorithm,
-                                "key_info": info["key_info"],
-                            }
+                            bundle = fhe_manager.key_bundle(algorithm)
+                            payload = json_with_raw(
+                                {"type": "KEY_STATUS", "algorithm": algorithm},
+                                key_info=bundle.key_info_json(),
+                            )
                         except ValueError as exc:
-                            payload = {"type": "FHE_ERROR", "error": str(exc)}
+                            payload = json.dumps({"type": "FHE_ERROR", "error": str(exc)})
                     else:
-                        payload = {
-                            "type": "KEY_STATUS",
-                            "keys": fhe_manager.get_all_key_bundles(),
-                        }
-                    await websocket.send(json.dumps(payload))
+                        payload = build_keys_message("KEY_STATUS")
+                    await websocket.send(payload)
+
+                elif msg_type == "GET_METRICS":
+                    await websocket.send(
+                        json.dumps({"type": "METRICS", **collect_metrics()})
+                    )
 
                 elif msg_type == "MPC_GENERATE_SECRET":
                     secret = secrets.randbelow(9_000_000) + 1_000_000
@@ -257,6 +630,11 @@ async def handler(websocket: WebSocketServerProtocol) -> None:
 
             except json.JSONDecodeError:
                 logger.error("接收到非 JSON 数据")
+            except wire_format.FrameError as exc:
+                logger.error("接收到无效的二进制帧: %s", exc)
+                await websocket.send(
+                    json.dumps({"type": "ERROR", "error": f"无效的二进制帧: {exc}"})
+                )
             except Exception as exc:  # noqa: BLE001
                 logger.exception("处理消息时发生未知错误: %s", exc)
 
@@ -264,23 +642,21 @@ async def handler(websocket: WebSocketServerProtocol) -> None:
         logger.info("连接断开: %s", client_addr)
     finally:
         connected_clients.discard(websocket)
+        broadcaster.unregister(websocket)
         mpc_sessions.pop(websocket, None)
 
 
 async def main() -> None:
     logger.info("=== AliceCrypto 后端服务启动 ===")
     logger.info("正在初始化多算法 FHE 引擎...")
+    logger.info("大整数运算后端: %s", bigint.BACKEND)
 
     loop = asyncio.get_running_loop()
 
     def on_key_rotation() -> None:
-        payload = {
-            "type": "KEY_ROTATED",
-            **build_server_time(),
-            "keys": fhe_manager.get_all_key_bundles(),
-        }
+        payload = build_keys_message("KEY_ROTATED", with_time=True)
         logger.info("已轮换 FHE 密钥，通知 %d 个客户端", len(connected_clients))
-        asyncio.run_coroutine_threadsafe(broadcast(payload), loop)
+        loop.call_soon_threadsafe(broadcaster.publish, payload)
 
     fhe_manager.start_auto_rotation(on_rotate=on_key_rotation)
     logger.info("密钥轮换线程已启动，周期 5 分钟")
@@ -305,6 +681,18 @@ if HAS_AIOHTTP:
             'timestamp': datetime.utcnow().isoformat()
         })
 
+    async def metrics_endpoint(request: web.Request) -> web.Response:
+        """运行指标：工作队列深度、等待时间与引擎统计"""
+        return web.json_response(collect_metrics())
+
+    def busy_response(exc: ServerBusyError) -> web.Response:
+        """密码哈希队列已满时返回 503，并通过 Retry-After 提示重试时间"""
+        return web.json_response(
+            {'error': str(exc), 'retry_after': exc.retry_after},
+            status=503,
+            headers={'Retry-After': str(max(1, round(exc.retry_after)))}
+        )
+
     async def register_endpoint(request: web.Request) -> web.Response:
         """用户注册端点"""
         try:
@@ -331,7 +719,10 @@ if HAS_AIOHTTP:
                 status=400
             )
 
-        result = register_user(username, password, email)
+        try:
+            result = await db.register_user(username, password, email)
+        except ServerBusyError as exc:
+            return busy_response(exc)
 
         if result['success']:
             return web.json_response(
@@ -369,7 +760,10 @@ if HAS_AIOHTTP:
         # 获取客户端 IP
         ip_address = request.remote
 
-        result = login_user(username, password, ip_address)
+        try:
+            result = await db.login_user(username, password, ip_address)
+        except ServerBusyError as exc:
+            return busy_response(exc)
 
         if result['success']:
             return web.json_response(
@@ -396,14 +790,14 @@ if HAS_AIOHTTP:
                 status=401
             )
 
-        user = verify_token(token)
+        user = await db.verify_token(token)
         if not user:
             return web.json_response(
                 {'error': '无效的令牌'},
                 status=401
             )
 
-        logout_user(token)
+        await db.logout_user(token)
         return web.json_response(
             {'message': '登出成功'},
             status=200
@@ -419,7 +813,7 @@ if HAS_AIOHTTP:
                 status=401
             )
 
-        user = verify_token(token)
+        user = await db.verify_token(token)
         if not user:
             return web.json_response(
                 {'error': '无效或过期的令牌'},
@@ -434,6 +828,38 @@ if HAS_AIOHTTP:
             status=200
         )
 
+    async def rotate_keys_endpoint(request: web.Request) -> web.Response:
+        """立即轮换全部 FHE 密钥并推送 KEY_ROTATED，需在 X-Admin-Token 中提供 FHE_ADMIN_TOKEN"""
+        if not ADMIN_TOKEN:
+            return web.json_response(
+                {'error': '管理接口未启用'},
+                status=404
+            )
+        if not secrets.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+            return web.json_response(
+                {'error': '无效的管理令牌'},
+                status=403
+            )
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        # 下一纪元通常已预生成，否则需等待密钥生成，放到线程中执行
+        await loop.run_in_executor(None, fhe_manager.rotate_now)
+        elapsed_ms = (loop.time() - started) * 1000
+        # 与自动轮换一样立即预生成再下一纪元，连续强制轮换时不必现场生成密钥
+        fhe_manager.prepare_next_epoch()
+        broadcaster.publish(build_keys_message("KEY_ROTATED", with_time=True))
+        epoch = fhe_manager.current_snapshot().epoch
+        logger.info("已手动轮换 FHE 密钥（纪元 %d，耗时 %.0f ms）", epoch, elapsed_ms)
+        return web.json_response(
+            {
+                'message': '密钥已轮换',
+                'epoch': epoch,
+                'elapsed_ms': round(elapsed_ms, 1)
+            },
+            status=200
+        )
+
     async def start_http_server() -> web.AppRunner:
         """启动 HTTP 服务器用于 REST API"""
         # 添加一个简单的 CORS 中间件，处理浏览器的 preflight OPTIONS 请求
@@ -458,6 +884,8 @@ if HAS_AIOHTTP:
         app.router.add_post('/api/auth/logout', logout_endpoint)
         app.router.add_get('/api/auth/profile', profile_endpoint)
         app.router.add_get('/api/health', health_check)
+        app.router.add_get('/api/metrics', metrics_endpoint)
+        app.router.add_post('/api/admin/rotate-keys', rotate_keys_endpoint)
 
         runner = web.AppRunner(app)
         await runner.setup()
@@ -470,17 +898,14 @@ if HAS_AIOHTTP:
         """同时运行 WebSocket 和 HTTP 服务器"""
         logger.info("=== AliceCrypto 后端服务启动（含 REST API）===")
         logger.info("正在初始化多算法 FHE 引擎...")
+        logger.info("大整数运算后端: %s", bigint.BACKEND)
 
         loop = asyncio.get_running_loop()
 
         def on_key_rotation() -> None:
-            payload = {
-                "type": "KEY_ROTATED",
-                **build_server_time(),
-                "keys": fhe_manager.get_all_key_bundles(),
-            }
+            payload = build_keys_message("KEY_ROTATED", with_time=True)
             logger.info("已轮换 FHE 密钥，通知 %d 个客户端", len(connected_clients))
-            asyncio.run_coroutine_threadsafe(broadcast(payload), loop)
+            loop.call_soon_threadsafe(broadcaster.publish, payload)
 
         fhe_manager.start_auto_rotation(on_rotate=on_key_rotation)
         logger.info("密钥轮换线程已启动，周期 5 分钟")
@@ -498,6 +923,8 @@ if HAS_AIOHTTP:
         finally:
             if 'http_runner' in locals():
                 await http_runner.cleanup()
+            # 写入积压的会话记录
+            db.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,284 @@
+"""NIST P-256 曲线上的纯 Python 点运算。
+
+仿射点用 (x, y) 元组表示，无穷远点为 None；内部累加使用 Jacobian 坐标
+(X, Y, Z)，Z = 0 表示无穷远点，只在输出时做一次（或一批一次）模逆。
+另提供固定底数窗口表与小步大步（BSGS）离散对数表，供指数 ElGamal 使用。
+"""
+
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+P = 0xFFFFFFFF00000001000000000000000000000000FFFFFFFFFFFFFFFFFFFFFFFF
+N = 0xFFFFFFFF00000000FFFFFFFFFFFFFFFFBCE6FAADA7179E84F3B9CAC2FC632551
+B = 0x5AC635D8AA3A93E7B3EBBD55769886BC651D06B0CC53B0F63BCE3C3E27D2604B
+G = (
+    0x6B17D1F2E12C4247F8BCE6E563A440F277037D812DEB33A0F4A13945D898C296,
+    0x4FE342E2FE1A7F9B8EE7EB4A7C0F9E162BCE33576B315ECECBB6406837BF51F5,
+)
+
+# 压缩点编码长度：1 字节前缀 + 32 字节 x；无穷远点编码为全零
+POINT_BYTES = 33
+
+Point = Optional[Tuple[int, int]]
+Jacobian = Tuple[int, int, int]
+
+JACOBIAN_INFINITY: Jacobian = (1, 1, 0)
+
+
+def _double(pt: Jacobian) -> Jacobian:
+    # dbl-2001-b，a = -3
+    x1, y1, z1 = pt
+    if z1 == 0 or y1 == 0:
+        return JACOBIAN_INFINITY
+    delta = z1 * z1 % P
+    gamma = y1 * y1 % P
+    beta = x1 * gamma % P
+    alpha = 3 * (x1 - delta) * (x1 + delta) % P
+    x3 = (alpha * alpha - 8 * beta) % P
+    z3 = ((y1 + z1) * (y1 + z1) - gamma - delta) % P
+    y3 = (alpha * (4 * beta - x3) - 8 * gamma * gamma) % P
+    return x3, y3, z3
+
+
+def add_mixed(pt: Jacobian, other: Point) -> Jacobian:
+    """Jacobian 点加仿射点（madd-2007-bl）。"""
+    if other is None:
+        return pt
+    x2, y2 = other
+    x1, y1, z1 = pt
+    if z1 == 0:
+        return x2, y2, 1
+    z1z1 = z1 * z1 % P
+    u2 = x2 * z1z1 % P
+    s2 = y2 * z1 * z1z1 % P
+    h = (u2 - x1) % P
+    r = 2 * (s2 - y1) % P
+    if h == 0:
+        return _double(pt) if r == 0 else JACOBIAN_INFINITY
+    hh = h * h % P
+    i = 4 * hh % P
+    j = h * i % P
+    v = x1 * i % P
+    x3 = (r * r - j - 2 * v) % P
+    y3 = (r * (v - x3) - 2 * y1 * j) % P
+    z3 = ((z1 + h) * (z1 + h) - z1z1 - hh) % P
+    return x3, y3, z3
+
+
+def to_affine(pt: Jacobian) -> Point:
+    x, y, z = pt
+    if z == 0:
+        return None
+    z_inv = pow(z, -1, P)
+    z_inv2 = z_inv * z_inv % P
+    return x * z_inv2 % P, y * z_inv2 * z_inv % P
+
+
+def normalize_batch(points: List[Jacobian]) -> List[Point]:
+    """批量转换为仿射坐标，用 Montgomery 技巧把 n 次模逆合并为 1 次。"""
+    prefix: List[int] = []
+    running = 1
+    for _, _, z in points:
+        prefix.append(running)
+        if z:
+            running = running * z % P
+    inverse = pow(running, -1, P)
+    result: List[Point] = [None] * len(points)
+    for index in range(len(points) - 1, -1, -1):
+        x, y, z = points[index]
+        if z == 0:
+            continue
+        z_inv = inverse * prefix[index] % P
+        inverse = inverse * z % P
+        z_inv2 = z_inv * z_inv % P
+        result[index] = (x * z_inv2 % P, y * z_inv2 * z_inv % P)
+    return result
+
+
+def negate(pt: Point) -> Point:
+    if pt is None:
+        return None
+    return pt[0], (-pt[1]) % P
+
+
+def add(left: Point, right: Point) -> Point:
+    if left is None:
+        return right
+    return to_affine(add_mixed((left[0], left[1], 1), right))
+
+
+def multiply(pt: Point, k: int) -> Point:
+    """变底数标量乘（从高位开始的倍加），用于解密。"""
+    k %= N
+    if pt is None or k == 0:
+        return None
+    acc = JACOBIAN_INFINITY
+    for bit in bin(k)[2:]:
+        acc = _double(acc)
+        if bit == "1":
+            acc = add_mixed(acc, pt)
+    return to_affine(acc)
+
+
+def sum_points(points: Iterable[Point]) -> Point:
+    acc = JACOBIAN_INFINITY
+    for pt in points:
+        acc = add_mixed(acc, pt)
+    return to_affine(acc)
+
+
+def _sqrt(value: int) -> Optional[int]:
+    # P ≡ 3 (mod 4)
+    root = pow(value, (P + 1) // 4, P)
+    return root if root * root % P == value else None
+
+
+def encode_point(pt: Point) -> bytes:
+    if pt is None:
+        return bytes(POINT_BYTES)
+    x, y = pt
+    return bytes([2 | (y & 1)]) + x.to_bytes(32, "big")
+
+
+def decode_point(data: bytes) -> Point:
+    """解析压缩点；解压时求出的点必在曲线上，P-256 余因子为 1，故也在子群内。"""
+    if len(data) != POINT_BYTES:
+        raise ValueError("无效的椭圆曲线点")
+    prefix = data[0]
+    x = int.from_bytes(data[1:], "big")
+    if prefix == 0 and x == 0:
+        return None
+    if prefix not in (2, 3) or x >= P:
+        raise ValueError("无效的椭圆曲线点")
+    y = _sqrt((x * x * x - 3 * x + B) % P)
+    if y is None:
+        raise ValueError("无效的椭圆曲线点")
+    if (y & 1) != (prefix & 1):
+        y = P - y
+    return x, y
+
+
+class FixedBaseTable:
+    """固定底数的窗口表：第 j 行存 d·2^(w·j)·base，标量乘只需按窗口查表相加。"""
+
+    def __init__(self, base: Point, window: int = 8) -> None:
+        self.base = base
+        self.window = window
+        self.rows: List[List[Point]] = []
+        row_base = base
+        for _ in range(-(-N.bit_length() // window)):
+            multiples: List[Jacobian] = [JACOBIAN_INFINITY]
+            for _ in range((1 << window) - 1):
+                multiples.append(add_mixed(multiples[-1], row_base))
+            # 下一行的底数 2^w·row_base 与本行一同归一化
+            next_base = add_mixed(multiples[-1], row_base)
+            normalized = normalize_batch(multiples + [next_base])
+            self.rows.append(normalized[:-1])
+            row_base = normalized[-1]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.rows) * (1 << self.window) * 64
+
+    def add_multiple(self, acc: Jacobian, k: int) -> Jacobian:
+        """返回 acc + k·base（Jacobian 坐标）。"""
+        k %= N
+        mask = (1 << self.window) - 1
+        for row in self.rows:
+            digit = k & mask
+            if digit:
+                acc = add_mixed(acc, row[digit])
+            k >>= self.window
+            if not k:
+                break
+        return acc
+
+    def multiply(self, k: int) -> Point:
+        return to_affine(self.add_multiple(JACOBIAN_INFINITY, k))
+
+
+class DiscreteLogTable:
+    """求解 M = m·G（|m| ≤ bound）的小步大步表。
+
+    小步表记录 j·G（1 ≤ j ≤ baby_steps）x 坐标的低 64 位到带符号 j 的映射，
+    ±j·G 共用一项并以 y 的奇偶区分；大步步长为 2·baby_steps + 1。
+    """
+
+    def __init__(self, baby_steps: int = 1 << 16) -> None:
+        self.baby_steps = baby_steps
+        self.stride = 2 * baby_steps + 1
+        multiples: List[Jacobian] = []
+        acc = JACOBIAN_INFINITY
+        for _ in range(baby_steps):
+            acc = add_mixed(acc, G)
+            multiples.append(acc)
+        self._table: Dict[int, int] = {}
+        for j, (x, y) in enumerate(normalize_batch(multiples), start=1):
+            self._table[x & 0xFFFFFFFFFFFFFFFF] = j if y % 2 == 0 else -j
+        last = to_affine(multiples[-1])
+        stride_point = add(add(last, last), G)
+        self._giant_step = negate(stride_point)
+        self._giant_back = stride_point
+
+    def _lookup(self, pt: Point) -> Optional[int]:
+        if pt is None:
+            return 0
+        value = self._table.get(pt[0] & 0xFFFFFFFFFFFFFFFF)
+        if value is None:
+            return None
+        return value if pt[1] % 2 == 0 else -value
+
+    def solve(self, target: Point, bound: int) -> Optional[int]:
+        """返回 m（|m| ≤ bound），不在范围内返回 None。
+
+        向两个方向的大步在 Jacobian 坐标下推进并按批归一化；批大小从 16 起
+        倍增到 1024，小的和（最常见）几乎不付出批处理的开销。
+        """
+        g_table = base_table()
+        max_giant = bound // self.stride + 1
+        forward = backward = (target[0], target[1], 1) if target is not None else JACOBIAN_INFINITY
+        first, batch = 0, 16
+        while first <= max_giant:
+            steps = range(first, min(first + batch, max_giant + 1))
+            first += batch
+            batch = min(2 * batch, 1024)
+            points: List[Jacobian] = []
+            for _ in steps:
+                points.append(forward)
+                points.append(backward)
+                forward = add_mixed(forward, self._giant_step)
+                backward = add_mixed(backward, self._giant_back)
+            normalized = normalize_batch(points)
+            for index, i in enumerate(steps):
+                # 第 i 步：forward = M - i·T，backward = M + i·T
+                for candidate, offset in ((normalized[2 * index], i), (normalized[2 * index + 1], -i)):
+                    j = self._lookup(candidate)
+                    if j is None:
+                        continue
+                    m = offset * self.stride + j
+                    # 表中只存 x 的低 64 位，命中后再验证一次
+                    if abs(m) <= bound and g_table.multiply(m) == target:
+                        return m
+        return None
+
+
+_tables_lock = threading.Lock()
+_base_table: Optional[FixedBaseTable] = None
+_dlog_tables: Dict[int, DiscreteLogTable] = {}
+
+
+def base_table() -> FixedBaseTable:
+    """生成元 G 的固定底数表，进程内共享、首次使用时构建。"""
+    global _base_table
+    with _tables_lock:
+        if _base_table is None:
+            _base_table = FixedBaseTable(G)
+        return _base_table
+
+
+def dlog_table(baby_steps: int) -> DiscreteLogTable:
+    with _tables_lock:
+        table = _dlog_tables.get(baby_steps)
+        if table is None:
+            table = _dlog_tables[baby_steps] = DiscreteLogTable(baby_steps)
+        return table
@@ -1,4 +1,5 @@
 from phe import paillier, EncryptedNumber
+from phe.util import HAVE_GMP
 import threading
 import time
 from datetime import datetime, timedelta
@@ -17,7 +18,8 @@ def init_paillier_keys(key_size=2048):
     global _public_key, _private_key, _key_generated_at
     
     with _key_lock:
-        print(f"[Paillier] 正在生成 {key_size} 位密钥对，请稍候...")
+        backend = "gmpy2" if HAVE_GMP else "python"
+        print(f"[Paillier] 正在生成 {key_size} 位密钥对（大整数后端: {backend}），请稍候...")
         start_time = time.time()
         _public_key, _private_key = paillier.generate_paillier_keypair(n_length=key_size)
         _key_generated_at = datetime.now()
@@ -0,0 +1,15 @@
+"""延迟分位数。
+
+服务端指标（work_queue）与 benchmarks/ 下的压测脚本共用同一种取法：
+最近秩（nearest-rank）分位数，不做插值，便于不同报告之间直接比较。
+"""
+
+from typing import Iterable
+
+
+def percentile(values: Iterable[float], pct: float) -> float:
+    """返回 values 的第 pct 百分位数；values 无需预先排序，为空时返回 0.0。"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
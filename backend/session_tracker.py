@@ -0,0 +1,202 @@
+"""user_sessions 表的写回（write-behind）记录器。
+
+登录产生的会话行与令牌校验带来的 last_activity 更新先在内存中累积，由后台
+线程每隔 flush_interval 秒（或积压达到 max_batch 条时提前）在一个事务中批量
+写入：同一令牌在一个周期内的多次活动只写最后一次。同一事务末尾按保留策略
+增量清理 last_activity 早于 retention_days 天的会话，每次最多删除
+prune_batch 行，避免长时间持有写锁。
+
+会话表只用于审计与统计，令牌有效性仍以 users.token 为准，因此延迟写入不影响
+认证；进程异常退出时最多丢失最近一个周期的记录。
+"""
+
+import datetime
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
+
+Connect = Callable[[], ContextManager[sqlite3.Connection]]
+
+
+_now_cache: Tuple[int, str] = (0, "")
+
+
+def _utc_now() -> str:
+    # 与 SQLite CURRENT_TIMESTAMP 的格式一致（UTC，精确到秒），可直接按字符串比较；
+    # 令牌校验的热路径每次都会调用，同一秒内复用格式化结果
+    global _now_cache
+    second = int(time.time())
+    if _now_cache[0] != second:
+        stamp = datetime.datetime.fromtimestamp(second, datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        _now_cache = (second, stamp)
+    return _now_cache[1]
+
+
+class SessionTracker:
+    def __init__(
+        self,
+        connect: Connect,
+        flush_interval: float = 2.0,
+        max_batch: int = 500,
+        max_pending: int = 50000,
+        retention_days: float = 30.0,
+        prune_batch: int = 500,
+        prune_interval: float = 60.0,
+    ) -> None:
+        self._connect = connect
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.retention_days = retention_days
+        self.prune_batch = prune_batch
+        self.prune_interval = prune_interval
+        self._lock = threading.Lock()
+        # 串行化 flush，后台线程与 close() 不会同时写
+        self._flush_lock = threading.Lock()
+        self._inserts: List[Tuple[int, str, Optional[str], str]] = []
+        # token -> 最近一次活动时间
+        self._touches: Dict[str, str] = {}
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._next_prune = 0.0
+        self.flushes = 0
+        self.inserted = 0
+        self.touched = 0
+        self.coalesced = 0
+        self.pruned = 0
+        self.dropped = 0
+        self.errors = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+
+    def record_login(self, user_id: int, token: str, ip_address: Optional[str]) -> None:
+        with self._lock:
+            if len(self._inserts) >= self.max_pending:
+                self.dropped += 1
+                return
+            self._inserts.append((user_id, token, ip_address, _utc_now()))
+            backlog = len(self._inserts) + len(self._touches)
+        self._ensure_started(backlog)
+
+    def touch(self, token: str) -> None:
+        """记录令牌的一次使用，同一周期内只保留最后一次"""
+        with self._lock:
+            if token in self._touches:
+                self.coalesced += 1
+            elif len(self._touches) >= self.max_pending:
+                self.dropped += 1
+                return
+            self._touches[token] = _utc_now()
+            backlog = len(self._inserts) + len(self._touches)
+        self._ensure_started(backlog)
+
+    def _ensure_started(self, backlog: int) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None and not self._stopped.is_set():
+                    self._thread = threading.Thread(
+                        target=self._run, name="session-flush", daemon=True
+                    )
+                    self._thread.start()
+        if backlog >= self.max_batch:
+            self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            self.flush()
+
+    def flush(self) -> int:
+        """把积压的写入与到期的清理放在一个事务中提交，返回写入行数"""
+        with self._flush_lock:
+            with self._lock:
+                inserts, self._inserts = self._inserts, []
+                touches, self._touches = self._touches, {}
+            prune = self.retention_days > 0 and time.monotonic() >= self._next_prune
+            if not inserts and not touches and not prune:
+                return 0
+
+            started = time.perf_counter()
+            pruned = 0
+            try:
+                with self._connect() as conn:
+                    c = conn.cursor()
+                    # 令牌唯一，重复行（理论上不会出现）忽略而不是让整批失败
+                    c.executemany(
+                        """INSERT OR IGNORE INTO user_sessions
+                           (user_id, token, ip_address, login_time, last_activity)
+                           VALUES (?, ?, ?, ?, ?)""",
+                        [(user_id, token, ip, at, at) for user_id, token, ip, at in inserts],
+                    )
+                    # 会话行在同一事务中先插入，新登录的活动也能更新到
+                    c.executemany(
+                        "UPDATE user_sessions SET last_activity = ? WHERE token = ?",
+                        [(at, token) for token, at in touches.items()],
+                    )
+                    if prune:
+                        c.execute(
+                            """DELETE FROM user_sessions WHERE id IN
+                               (SELECT id FROM user_sessions
+                                WHERE last_activity < datetime('now', ?)
+                                LIMIT ?)""",
+                            (f"-{self.retention_days} days", self.prune_batch),
+                        )
+                        pruned = c.rowcount
+                    conn.commit()
+            except sqlite3.Error as e:
+                # 放回队列等待下个周期重试，超出上限的部分丢弃
+                with self._lock:
+                    self.errors += 1
+                    self._inserts[:0] = inserts[:max(0, self.max_pending - len(self._inserts))]
+                    for token, at in touches.items():
+                        self._touches.setdefault(token, at)
+                print(f"[Database] 会话批量写入失败: {e}")
+                return 0
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.flushes += 1
+                self.inserted += len(inserts)
+                self.touched += len(touches)
+                self.pruned += pruned
+                self._last_flush_ms = elapsed_ms
+                self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+            if prune:
+                # 删满一批说明还有积压，下个周期继续清理
+                self._next_prune = 0.0 if pruned >= self.prune_batch else time.monotonic() + self.prune_interval
+            return len(inserts) + len(touches)
+
+    def close(self) -> None:
+        """停止后台线程并写入剩余记录"""
+        self._stopped.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+        self.flush()
+        with self._lock:
+            self._thread = None
+        self._stopped.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pending_inserts": len(self._inserts),
+                "pending_touches": len(self._touches),
+                "flush_interval": self.flush_interval,
+                "retention_days": self.retention_days,
+                "flushes": self.flushes,
+                "inserted": self.inserted,
+                "touched": self.touched,
+                "coalesced": self.coalesced,
+                "pruned": self.pruned,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "last_flush_ms": round(self._last_flush_ms, 2),
+                "max_flush_ms": round(self._max_flush_ms, 2),
+            }
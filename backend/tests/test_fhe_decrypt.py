@@ -0,0 +1,63 @@
+"""CRT 解密与 ElGamal 合并求逆的等价性检验。
+
+RSA 的 _decrypt 走 CRT（Garner 重组），ElGamal 的 finalize_raw 用一次
+c1^(p-1-x) 同时完成共享密钥与求逆；两者都应与改动前的写法逐位相同：
+pow(c, d, n)，以及 pow(c1, x, p) 之后再做 Fermat 求逆。
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fhe_service import ElGamalEngine, RSAEngine  # noqa: E402
+
+SAMPLES = 200
+
+
+@pytest.mark.parametrize("bits", [64, 512, 1024])
+def test_rsa_crt_decrypt_matches_plain_powmod(bits: int) -> None:
+    engine = RSAEngine(bits)
+    rng = random.Random(bits)
+    ciphertexts = [0, 1, engine.n - 1] + [rng.randrange(engine.n) for _ in range(SAMPLES)]
+    for c in ciphertexts:
+        assert engine._decrypt(c) == pow(c, engine.d, engine.n)
+
+
+def test_rsa_finalize_matches_product_of_plaintexts() -> None:
+    engine = RSAEngine(1024)
+    rng = random.Random(1)
+    values = [rng.randrange(1, 1000) for _ in range(20)]
+    ciphertexts = [c for _, c in engine.encrypt_raw(values)]
+    expected = 1
+    for value in values:
+        expected = expected * value % engine.n
+    acc = engine.aggregate_raw(ciphertexts)
+    assert engine.finalize_raw(acc) == (acc, expected)
+    assert engine.finalize_raw(acc)[1] == pow(acc, engine.d, engine.n)
+
+
+@pytest.mark.parametrize("bits", [64, 128, 384])
+def test_elgamal_finalize_matches_fermat_inverse(bits: int) -> None:
+    engine = ElGamalEngine(bits, table_budget=0)
+    p, x = engine.p, engine.x
+    rng = random.Random(bits)
+    for _ in range(SAMPLES):
+        c1, c2 = rng.randrange(1, p), rng.randrange(1, p)
+        shared = pow(c1, x, p)
+        expected = c2 * pow(shared, p - 2, p) % p
+        assert engine.finalize_raw((c1, c2)) == ((c1, c2), expected)
+
+
+def test_elgamal_finalize_recovers_product() -> None:
+    engine = ElGamalEngine(384)
+    rng = random.Random(2)
+    values = [rng.randrange(1, 1000) for _ in range(20)]
+    ciphertexts = [c for _, c in engine.encrypt_raw(values)]
+    expected = 1
+    for value in values:
+        expected = expected * value % engine.p
+    assert engine.finalize_raw(engine.aggregate_raw(ciphertexts))[1] == expected
@@ -0,0 +1,131 @@
+"""FHEManager 的密钥纪元：轮换、宽限窗口与从密钥存储恢复。
+
+为缩短密钥生成时间，测试中的引擎使用较短的模数，且不建工作进程池。
+"""
+
+import os
+import sys
+import time
+from typing import List
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fhe_service import (  # noqa: E402
+    BaseEngine,
+    DamgardJurikEngine,
+    ECElGamalEngine,
+    ElGamalEngine,
+    FHEManager,
+    PaillierEngine,
+    RSAEngine,
+)
+from key_store import KeyStore  # noqa: E402
+
+
+class SmallKeyManager(FHEManager):
+    def __init__(self, **kwargs) -> None:
+        kwargs.setdefault("max_workers", 1)
+        super().__init__(**kwargs)
+
+    def _create_engines(self) -> List[BaseEngine]:
+        return [
+            PaillierEngine(512),
+            RSAEngine(512),
+            ElGamalEngine(128),
+            DamgardJurikEngine(512, s=2),
+            ECElGamalEngine(),
+        ]
+
+
+@pytest.fixture
+def manager():
+    managers: List[FHEManager] = []
+
+    def build(**kwargs) -> FHEManager:
+        managers.append(SmallKeyManager(**kwargs))
+        return managers[-1]
+
+    yield build
+    for item in managers:
+        for snapshot in [item.current_snapshot()] + [s for s, _ in item._retired.values()]:
+            for engine in snapshot.engines.values():
+                engine.close()
+        item.close()
+
+
+def _encrypt(manager: FHEManager, values: List[int]) -> List[str]:
+    return [item["ciphertext"] for item in manager.encrypt_batch("PAILLIER", values)]
+
+
+def test_rotation_advances_epoch_and_keeps_previous_for_grace(manager) -> None:
+    fhe = manager(grace_epochs=2)
+    assert fhe.current_snapshot().epoch == 0
+    old_ciphertexts = _encrypt(fhe, [1, 2, 3])
+    fhe.rotate_now()
+    assert fhe.current_snapshot().epoch == 1
+    assert fhe.live_epochs() == [1, 0]
+    # 旧纪元加密的密文在宽限期内仍可按原纪元计算
+    assert fhe.compute("PAILLIER", old_ciphertexts, epoch=0)["plaintext"] == 6
+    assert fhe.compute("PAILLIER", _encrypt(fhe, [4, 5]), epoch=1)["plaintext"] == 9
+    assert fhe.compute("PAILLIER", _encrypt(fhe, [4, 5]))["plaintext"] == 9
+
+
+def test_only_grace_epochs_are_retained(manager) -> None:
+    fhe = manager(grace_epochs=1)
+    fhe.rotate_now()
+    fhe.rotate_now()
+    assert fhe.live_epochs() == [2, 1]
+    with pytest.raises(ValueError):
+        fhe.snapshot_for(0)
+
+
+def test_retired_epoch_expires_after_grace_period(manager) -> None:
+    fhe = manager(grace_period=0)
+    fhe.rotate_now()
+    time.sleep(0.01)
+    assert fhe.live_epochs() == [1]
+    with pytest.raises(ValueError):
+        fhe.snapshot_for(0)
+
+
+@pytest.mark.parametrize("epoch", ["abc", 99, -1])
+def test_unknown_epoch_is_rejected(manager, epoch) -> None:
+    fhe = manager()
+    with pytest.raises(ValueError):
+        fhe.snapshot_for(epoch)
+
+
+def test_retired_engines_release_background_resources(manager) -> None:
+    fhe = manager()
+    previous = fhe._get_engine("PAILLIER")
+    assert previous.pool.running
+    fhe.rotate_now()
+    assert not previous.pool.running
+    assert fhe._get_engine("PAILLIER").pool.running
+
+
+def test_restart_restores_current_and_grace_epochs(manager, tmp_path) -> None:
+    path = str(tmp_path / "keys.db")
+    first = manager(key_store=KeyStore(path), rotation_interval=3600)
+    old_ciphertexts = _encrypt(first, [10, 20])
+    first.rotate_now()
+    current_n = first._get_engine("PAILLIER").public_key.n
+    new_ciphertexts = _encrypt(first, [7])
+
+    second = manager(key_store=KeyStore(path), rotation_interval=3600)
+    assert second.current_snapshot().epoch == 1
+    assert second._get_engine("PAILLIER").public_key.n == current_n
+    assert second.live_epochs() == [1, 0]
+    assert second.compute("PAILLIER", old_ciphertexts, epoch=0)["plaintext"] == 30
+    assert second.compute("PAILLIER", new_ciphertexts, epoch=1)["plaintext"] == 7
+
+
+def test_expired_store_starts_a_new_epoch(manager, tmp_path) -> None:
+    path = str(tmp_path / "keys.db")
+    first = manager(key_store=KeyStore(path), rotation_interval=3600)
+    old_n = first._get_engine("PAILLIER").public_key.n
+    second = manager(key_store=KeyStore(path), rotation_interval=0)
+    assert second.current_snapshot().epoch == 1
+    assert second._get_engine("PAILLIER").public_key.n != old_n
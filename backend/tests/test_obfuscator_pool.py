@@ -0,0 +1,98 @@
+"""Paillier 混淆因子池与密钥轮换。
+
+池中的 r^n mod n² 只对生成时的 n 有效：rotate_keys 之后不得再取出旧因子，
+已启动的池要换上新密钥继续补充，未启动的池保持不预计算。
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fhe_service import PaillierEngine, _ObfuscatorPool  # noqa: E402
+
+BITS = 512
+
+
+def _wait_for(predicate, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "等待混淆因子池补充超时"
+        time.sleep(0.01)
+
+
+def _round_trip(engine: PaillierEngine, values) -> int:
+    acc = engine.aggregate_raw(c for _, c in engine.encrypt_raw(values))
+    return engine.finalize_raw(acc)[1]
+
+
+def test_started_pool_is_refilled_for_new_key_after_rotation() -> None:
+    engine = PaillierEngine(BITS, pool_low_watermark=4, pool_high_watermark=8)
+    try:
+        engine.start()
+        _wait_for(lambda: len(engine.pool) >= 4)
+        old_n = engine.public_key.n
+        engine.rotate_keys()
+        assert engine.public_key.n != old_n
+        assert engine.pool.running
+        values = list(range(1, 21))
+        assert _round_trip(engine, values) == sum(values)
+        # 补充回来的因子来自新密钥，命中池的加密同样能正确解密
+        _wait_for(lambda: len(engine.pool) >= 4)
+        hits = engine.pool.stats()["hits"]
+        assert _round_trip(engine, [5, 6]) == 11
+        assert engine.pool.stats()["hits"] > hits
+    finally:
+        engine.close()
+
+
+def test_stale_obfuscators_are_discarded_on_rotation() -> None:
+    engine = PaillierEngine(BITS, pool_low_watermark=4, pool_high_watermark=8)
+    try:
+        engine.start()
+        _wait_for(lambda: len(engine.pool) >= 4)
+        stale = list(engine.pool._items)
+        engine.rotate_keys()
+        assert not set(engine.pool._items) & set(stale)
+        values = [engine.pool.take() for _ in range(len(stale))]
+        assert not set(values) & set(stale)
+    finally:
+        engine.close()
+
+
+def test_unstarted_pool_stays_idle_after_rotation() -> None:
+    engine = PaillierEngine(BITS)
+    try:
+        engine.rotate_keys()
+        assert not engine.pool.running
+        assert len(engine.pool) == 0
+        assert _round_trip(engine, [3, 4, 5]) == 12
+    finally:
+        engine.close()
+
+
+def test_closed_pool_is_not_restarted_by_rotation() -> None:
+    engine = PaillierEngine(BITS, pool_low_watermark=2, pool_high_watermark=4)
+    engine.start()
+    engine.close()
+    engine.rotate_keys()
+    assert not engine.pool.running
+    assert _round_trip(engine, [7, 8]) == 15
+
+
+def test_clear_pauses_refill_until_reset() -> None:
+    pool = _ObfuscatorPool(low_watermark=2, high_watermark=4, burst_pause=0)
+    counter = iter(range(1, 10_000))
+    pool.reset(lambda: next(counter))
+    try:
+        _wait_for(lambda: len(pool) >= 2)
+        pool.clear()
+        assert not pool.running
+        assert len(pool) == 0
+        assert pool.take() is None
+        pool.reset(lambda: -1)
+        _wait_for(lambda: len(pool) >= 2)
+        assert pool.take() == -1
+    finally:
+        pool.close()
@@ -0,0 +1,89 @@
+"""令牌校验缓存：TTL、负缓存、LRU 淘汰与失效时的版本检查。"""
+
+import os
+import sys
+from typing import Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from token_cache import TokenCache  # noqa: E402
+
+USER = {"id": 1, "username": "alice"}
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _cache(**kwargs) -> Tuple[TokenCache, FakeClock]:
+    clock = FakeClock()
+    return TokenCache(clock=clock, **kwargs), clock
+
+
+def test_valid_token_expires_after_ttl() -> None:
+    cache, clock = _cache(ttl=60, negative_ttl=10)
+    cache.put("t", USER, cache.version)
+    clock.now = 59.9
+    assert cache.get("t") == (True, USER)
+    clock.now = 60.0
+    assert cache.get("t") == (False, None)
+    assert cache.metrics()["expired"] == 1
+
+
+def test_invalid_token_is_negatively_cached_for_shorter_ttl() -> None:
+    cache, clock = _cache(ttl=60, negative_ttl=10)
+    cache.put("forged", None, cache.version)
+    clock.now = 9.9
+    assert cache.get("forged") == (True, None)
+    assert cache.metrics()["negative_hits"] == 1
+    clock.now = 10.0
+    assert cache.get("forged") == (False, None)
+
+
+def test_returned_user_is_a_copy() -> None:
+    cache, _ = _cache()
+    cache.put("t", USER, cache.version)
+    _, user = cache.get("t")
+    user["username"] = "mallory"
+    assert cache.get("t") == (True, USER)
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache, _ = _cache(max_size=2)
+    for token in ("a", "b"):
+        cache.put(token, {"id": ord(token)}, cache.version)
+    cache.get("a")
+    cache.put("c", {"id": 3}, cache.version)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a")[0] and cache.get("c")[0]
+    assert cache.metrics()["evictions"] == 1
+
+
+def test_put_after_concurrent_invalidation_is_dropped() -> None:
+    cache, _ = _cache()
+    version = cache.version
+    # 查库期间令牌被登出，迟到的查询结果不得写回缓存
+    cache.invalidate("t")
+    cache.put("t", USER, version)
+    assert cache.get("t") == (False, None)
+
+
+def test_invalidate_user_drops_all_tokens_of_that_user() -> None:
+    cache, _ = _cache()
+    cache.put("t1", USER, cache.version)
+    cache.put("t2", USER, cache.version)
+    cache.put("other", {"id": 2}, cache.version)
+    cache.invalidate_user(1)
+    assert cache.get("t1") == (False, None)
+    assert cache.get("t2") == (False, None)
+    assert cache.get("other")[0]
+
+
+def test_zero_size_disables_cache() -> None:
+    cache, _ = _cache(max_size=0)
+    cache.put("t", USER, cache.version)
+    assert cache.get("t") == (False, None)
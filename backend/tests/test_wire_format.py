@@ -0,0 +1,53 @@
+"""二进制帧解码对畸形输入的校验。"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import wire_format  # noqa: E402
+from wire_format import FrameError  # noqa: E402
+
+
+def _frame(header: bytes, payload: bytes = b"") -> bytes:
+    prefix = wire_format._PREFIX.pack(wire_format.MAGIC, wire_format.VERSION, len(header))
+    return prefix + header + payload
+
+
+def test_round_trip() -> None:
+    frame = wire_format.encode_frame({"type": "PING"}, [b"abc", b"", b"\x00\x01"])
+    assert wire_format.decode_frame(frame) == ({"type": "PING"}, [b"abc", b"", b"\x00\x01"])
+
+
+@pytest.mark.parametrize(
+    "header",
+    [b"[1, 2]", b'"text"', b"3", b"null", b"\xff\xfe", b"{"],
+)
+def test_rejects_non_object_header(header: bytes) -> None:
+    with pytest.raises(FrameError):
+        wire_format.decode_frame(_frame(header))
+
+
+@pytest.mark.parametrize(
+    "blobs",
+    [-1, "3", None, {"a": 1}, [-1], [1.5], ["2"], [True], [None], [[1]]],
+)
+def test_rejects_malformed_blob_lengths(blobs: object) -> None:
+    header = json.dumps({"type": "X", "blobs": blobs}).encode()
+    with pytest.raises(FrameError):
+        wire_format.decode_frame(_frame(header, b"abcd"))
+
+
+def test_rejects_out_of_range_lengths() -> None:
+    with pytest.raises(FrameError):
+        wire_format.decode_frame(_frame(json.dumps({"blobs": [3, 3]}).encode(), b"abcd"))
+    truncated = wire_format.encode_frame({"type": "PING"})[:-2]
+    with pytest.raises(FrameError):
+        wire_format.decode_frame(truncated)
+
+
+def test_frame_error_is_value_error() -> None:
+    assert issubclass(FrameError, ValueError)
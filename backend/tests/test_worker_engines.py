@@ -0,0 +1,53 @@
+"""工作进程侧的公钥缓存：按 (算法, 纪元) 缓存，未命中时要求父进程补发公钥。
+
+这里直接在本进程调用工作进程的任务函数，不经过进程池。
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fhe_service  # noqa: E402
+from fhe_service import PaillierEngine  # noqa: E402
+
+BITS = 512
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    fhe_service._worker_engines.clear()
+    yield
+    fhe_service._worker_engines.clear()
+
+
+def _decrypt_sum(engine: PaillierEngine, items) -> int:
+    return engine.finalize_raw(engine.aggregate_raw(c for _, c in items))[1]
+
+
+def test_missing_epoch_requires_payload() -> None:
+    with pytest.raises(fhe_service._WorkerKeyMissing):
+        fhe_service._encrypt_chunk("PAILLIER", 7, None, [1, 2])
+
+
+def test_payload_is_cached_per_epoch() -> None:
+    engine = PaillierEngine(BITS)
+    payload = engine.public_key_payload()
+    first = fhe_service._encrypt_chunk("PAILLIER", 1, payload, [1, 2, 3])
+    # 同一纪元之后的任务不再携带公钥
+    second = fhe_service._encrypt_chunk("PAILLIER", 1, None, [4, 5])
+    assert _decrypt_sum(engine, first + second) == 15
+    with pytest.raises(fhe_service._WorkerKeyMissing):
+        fhe_service._encrypt_chunk("PAILLIER", 2, None, [1])
+
+
+def test_cache_evicts_least_recently_used_epoch(monkeypatch) -> None:
+    monkeypatch.setattr(fhe_service, "_WORKER_ENGINE_CACHE", 2)
+    payload = PaillierEngine(BITS).public_key_payload()
+    for epoch in (1, 2):
+        fhe_service._encrypt_chunk("PAILLIER", epoch, payload, [1])
+    fhe_service._encrypt_chunk("PAILLIER", 1, None, [1])
+    fhe_service._encrypt_chunk("PAILLIER", 3, payload, [1])
+    assert set(fhe_service._worker_engines) == {("PAILLIER", 1), ("PAILLIER", 3)}
@@ -0,0 +1,127 @@
+"""进程内的令牌校验缓存。
+
+容量有界，按 LRU 淘汰；有效令牌缓存 ttl 秒，无效令牌按较短的 negative_ttl
+做负缓存，避免伪造令牌反复击穿到数据库。登出与重新登录会立即使相关条目失效。
+
+缓存与数据库之间存在读写竞争：查询开始后若发生失效，查询结果不再写入缓存，
+因此调用方应在查库前取得 version，并在 put 时原样传回。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+
+class TokenCache:
+    def __init__(
+        self,
+        max_size: int = 10000,
+        ttl: float = 60.0,
+        negative_ttl: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        # token -> (过期时间, 用户信息或 None)
+        self._entries: "OrderedDict[str, Tuple[float, Optional[Dict[str, Any]]]]" = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+        self._version = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get(self, token: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """返回 (是否命中, 用户信息)；命中负缓存时为 (True, None)。"""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            expires_at, user = entry
+            if expires_at <= self._clock():
+                self._remove(token)
+                self.expired += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(token)
+            if user is None:
+                self.negative_hits += 1
+                return True, None
+            self.hits += 1
+            return True, dict(user)
+
+    def put(self, token: str, user: Optional[Dict[str, Any]], version: int) -> None:
+        """写入查询结果；查询期间发生过失效（version 已变化）时放弃写入。"""
+        if self.max_size <= 0:
+            return
+        ttl = self.ttl if user is not None else self.negative_ttl
+        with self._lock:
+            if version != self._version:
+                return
+            self._remove(token)
+            self._entries[token] = (self._clock() + ttl, dict(user) if user else None)
+            if user is not None:
+                self._by_user.setdefault(user["id"], set()).add(token)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, token: str) -> None:
+        with self._lock:
+            self._version += 1
+            self.invalidations += 1
+            self._remove(token)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """用户重新登录后旧令牌作废，清除该用户的全部条目。"""
+        with self._lock:
+            self._version += 1
+            self.invalidations += 1
+            for token in list(self._by_user.get(user_id, ())):
+                self._remove(token)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _remove(self, token: str) -> None:
+        entry = self._entries.pop(token, None)
+        if entry is None or entry[1] is None:
+            return
+        user_id = entry[1]["id"]
+        tokens = self._by_user.get(user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_user[user_id]
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "negative_ttl": self.negative_ttl,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,129 @@
+"""二进制线格式。
+
+JSON 模式下大整数以十进制字符串传输；协商为二进制模式后，服务端改用
+WebSocket 二进制帧，大整数按定长大端字节存放：
+
+    MAGIC(2) | VERSION(1) | 头长度(4, 大端) | JSON 头 | 数据块 0 | 数据块 1 ...
+
+JSON 头中的 ``blobs`` 字段记录各数据块的字节长度。批量密文放在同一个
+数据块中，每个密文占 ``width`` 字节（ElGamal 为 c1、c2 各占一半）。
+"""
+
+import json
+import struct
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+MAGIC = b"AC"
+VERSION = 1
+FORMAT_JSON = "json"
+FORMAT_BINARY = "binary"
+SUPPORTED_FORMATS = (FORMAT_JSON, FORMAT_BINARY)
+
+_PREFIX = struct.Struct(">2sBI")
+_INT_LEN = struct.Struct(">H")
+
+
+class FrameError(ValueError):
+    """二进制帧格式错误。"""
+
+
+def int_to_bytes(value: int, width: int = 0) -> bytes:
+    width = width or max(1, (value.bit_length() + 7) // 8)
+    return value.to_bytes(width, "big")
+
+
+def int_from_bytes(data: bytes) -> int:
+    return int.from_bytes(data, "big")
+
+
+def pack_ints(values: Iterable[int]) -> bytes:
+    """把一组非负整数紧凑地拼接为 长度(2, 大端) | 大端字节 的序列。"""
+    parts: List[bytes] = []
+    for value in values:
+        raw = int_to_bytes(value)
+        parts.append(_INT_LEN.pack(len(raw)))
+        parts.append(raw)
+    return b"".join(parts)
+
+
+def unpack_ints(data: bytes) -> List[int]:
+    values: List[int] = []
+    view = memoryview(data)
+    offset = 0
+    while offset < len(data):
+        if offset + _INT_LEN.size > len(data):
+            raise FrameError("整数序列被截断")
+        (length,) = _INT_LEN.unpack_from(view, offset)
+        offset += _INT_LEN.size
+        if offset + length > len(data):
+            raise FrameError("整数序列被截断")
+        values.append(int.from_bytes(view[offset : offset + length], "big"))
+        offset += length
+    return values
+
+
+def encode_frame(header: Dict[str, Any], blobs: Sequence[bytes] = ()) -> bytes:
+    header = {**header, "blobs": [len(blob) for blob in blobs]}
+    raw_header = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    return b"".join([_PREFIX.pack(MAGIC, VERSION, len(raw_header)), raw_header, *blobs])
+
+
+def decode_frame(frame: bytes) -> Tuple[Dict[str, Any], List[bytes]]:
+    if len(frame) < _PREFIX.size:
+        raise FrameError("二进制帧过短")
+    magic, version, header_len = _PREFIX.unpack_from(frame)
+    if magic != MAGIC or version != VERSION:
+        raise FrameError("不支持的二进制帧版本")
+    offset = _PREFIX.size
+    if offset + header_len > len(frame):
+        raise FrameError("二进制帧头越界")
+    try:
+        header = json.loads(frame[offset : offset + header_len])
+    except ValueError as exc:
+        raise FrameError("二进制帧头不是有效的 JSON") from exc
+    if not isinstance(header, dict):
+        raise FrameError("二进制帧头必须是 JSON 对象")
+    offset += header_len
+
+    lengths = header.pop("blobs", [])
+    if not isinstance(lengths, list) or not all(
+        type(length) is int and length >= 0 for length in lengths
+    ):
+        raise FrameError("blobs 必须是非负整数列表")
+    blobs: List[bytes] = []
+    for length in lengths:
+        if offset + length > len(frame):
+            raise FrameError("二进制帧数据块越界")
+        blobs.append(frame[offset : offset + length])
+        offset += length
+    return header, blobs
+
+
+def encode_encrypted_batch(
+    header: Dict[str, Any], engine: Any, pairs: Iterable[Tuple[Any, Any]]
+) -> bytes:
+    pairs = list(pairs)
+    return encode_frame(
+        {
+            **header,
+            "originals": [original for original, _ in pairs],
+            "width": engine.ciphertext_width,
+            "count": len(pairs),
+        },
+        [engine.pack_ciphertexts(ciphertext for _, ciphertext in pairs)],
+    )
+
+
+def encode_compute_result(header: Dict[str, Any], engine: Any, result: Dict[str, Any]) -> bytes:
+    fields = {key: value for key, value in result.items() if key != "ciphertext"}
+    return encode_frame(
+        {**header, **fields, "width": engine.ciphertext_width},
+        [engine.pack_ciphertexts([result["ciphertext"]])],
+    )
+
+
+def encode_key_bundle(
+    header: Dict[str, Any], fields: Sequence[str], blobs: Sequence[bytes]
+) -> bytes:
+    """公钥各字段按 fields 顺序存放在对应的数据块中。"""
+    return encode_frame({**header, "pub_key_fields": list(fields)}, blobs)
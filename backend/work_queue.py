@@ -0,0 +1,116 @@
+"""有界的 CPU 任务调度器。
+
+将同态加密等 CPU 密集操作交给线程池执行，并限制同时执行与排队的任务数；
+排队任务数达到上限时立即拒绝，由调用方回复繁忙提示。
+
+线程只负责调度：纯 Python 的大模幂在整个调用期间持有 GIL，事件循环仍会被
+单次调用阻塞；大批量运算由任务内部再交给工作进程（见 FHEManager 的进程池）。
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict
+
+from percentiles import percentile
+
+
+class ServerBusyError(RuntimeError):
+    """工作队列已满，请求被拒绝。"""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__("服务器繁忙，请稍后重试")
+        self.retry_after = retry_after
+
+
+class WorkQueue:
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_pending: int = 32,
+        name: str = "fhe-worker",
+        latency_window: int = 1024,
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        # 最近若干次请求的总耗时（排队 + 执行），用于延迟分位数
+        self._latencies: Deque[float] = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._started = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+
+    def _retry_after(self) -> float:
+        # 以平均执行时长估算队列清空时间，至少 1 秒
+        avg_run = self._run_total / self.completed if self.completed else 1.0
+        return max(1.0, round(avg_run * self._pending / self.max_workers, 1))
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise ServerBusyError(self._retry_after())
+            self._pending += 1
+            self.submitted += 1
+        enqueued_at = time.perf_counter()
+
+        def job() -> Any:
+            started_at = time.perf_counter()
+            waited = started_at - enqueued_at
+            with self._lock:
+                self._running += 1
+                self._started += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._run_total += time.perf_counter() - started_at
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, job)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self.completed += 1
+                self._latencies.append(time.perf_counter() - enqueued_at)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            started = self._started
+            latencies = list(self._latencies)
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "depth": self._pending,
+                "running": self._running,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self._wait_total / started * 1000, 3) if started else 0.0,
+                "max_wait_ms": round(self._wait_max * 1000, 3),
+                "avg_run_ms": (
+                    round(self._run_total / self.completed * 1000, 3) if self.completed else 0.0
+                ),
+                **{
+                    f"latency_p{pct}_ms": (
+                        round(percentile(latencies, pct) * 1000, 3) if latencies else 0.0
+                    )
+                    for pct in (50, 95, 99)
+                },
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._executor.shutdown(wait=wait)
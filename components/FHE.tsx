@@ -102,7 +102,8 @@ const FHE: React.FC = () => {
         const newPackets = data.items.map((item: any) => ({
           id: Math.random().toString(36).substr(2, 5).toUpperCase(),
           originalValue: item.original,
-          ciphertext: item.ciphertext
+          ciphertext: item.ciphertext,
+          epoch: data.epoch
         }));
         setDataPackets(prev => [...prev, ...newPackets]);
         socketSim.log('SERVER', `批量加密完成 (${newPackets.length} 个)`, 'DATA');
@@ -195,10 +196,18 @@ const FHE: React.FC = () => {
     const operation = algorithm === 'PAILLIER' ? 'SUM' : 'PRODUCT';
     socketSim.log('CLIENT', `发送计算任务: ${operation}`, 'DATA');
 
+    // 只能合并同一密钥纪元下的密文，取最新纪元；旧纪元在宽限期内仍可计算
+    const epoch = dataPackets[dataPackets.length - 1].epoch;
+    const packets = dataPackets.filter(p => p.epoch === epoch);
+    if (packets.length < dataPackets.length) {
+      socketSim.log('CLIENT', `跳过 ${dataPackets.length - packets.length} 个旧纪元密文`, 'WARN');
+    }
+
     socketSim.send({
       type: 'COMPUTE_FHE',
       algorithm: algorithm,
-      ciphertexts: dataPackets.map(p => p.ciphertext)
+      epoch: epoch,
+      ciphertexts: packets.map(p => p.ciphertext)
     });
   };
 
@@ -18,6 +18,7 @@ export interface EncryptedDataPacket {
   id: string;
   originalValue?: number;
   ciphertext: string;
+  epoch?: number;
 }
 
 // FHE 算法类型
@@ -25,6 +26,8 @@ export type FHEAlgorithm = 'PAILLIER' | 'RSA' | 'ELGAMAL';
 
 // 密钥信息
 export interface KeyInfo {
+  epoch?: number;
+  grace_period?: number;
   generated_at: string;
   next_rotation_at: string;
   remaining_seconds: number;